@@ -0,0 +1,22 @@
+#include <stdio.h>
+
+static int collatz_length(int n) {
+    int steps = 0;
+    while (n != 1) {
+        n = (n % 2 == 0) ? n / 2 : 3 * n + 1;
+        steps++;
+    }
+    return steps;
+}
+
+int main(void) {
+    int longest = 0;
+    for (int i = 1; i < 100000; i++) {
+        int length = collatz_length(i);
+        if (length > longest) {
+            longest = length;
+        }
+    }
+    printf("%d\n", longest);
+    return 0;
+}
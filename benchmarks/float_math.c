@@ -0,0 +1,13 @@
+#include <stdio.h>
+
+int main(void) {
+    const int steps = 20000000;
+    const double width = 1.0 / steps;
+    double total = 0.0;
+    for (int i = 0; i < steps; i++) {
+        double x = (i + 0.5) * width;
+        total += 4.0 / (1.0 + x * x);
+    }
+    printf("%f\n", total * width);
+    return 0;
+}
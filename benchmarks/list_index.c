@@ -0,0 +1,18 @@
+#include <stdio.h>
+
+int main(void) {
+    int values[16] = {5, 3, 8, 1, 9, 2, 7, 4, 6, 0, 11, 15, 13, 10, 14, 12};
+    int checksum = 0;
+    for (int round = 0; round < 500000; round++) {
+        for (int k = 0; k < 16; k++) {
+            checksum += values[k] * values[15 - k];
+        }
+        int first = values[0];
+        for (int k = 1; k < 16; k++) {
+            values[k - 1] = values[k];
+        }
+        values[15] = first;
+    }
+    printf("%d\n", checksum);
+    return 0;
+}
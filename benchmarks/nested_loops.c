@@ -0,0 +1,17 @@
+#include <stdio.h>
+
+int main(void) {
+    const int n = 600;
+    int count = 0;
+    for (int i = 0; i < n; i++) {
+        for (int j = 0; j < n; j++) {
+            for (int k = 0; k < n; k++) {
+                if (i + j + k == n) {
+                    count++;
+                }
+            }
+        }
+    }
+    printf("%d\n", count);
+    return 0;
+}
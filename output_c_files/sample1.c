@@ -1,10 +1,12 @@
 #include <stdio.h>
 #include <string.h>
 
+static const int _list0[4] = {1, 2, 3, 4};
+
 int main() {
     int x = 0;
     printf("%d\n", x);
-    int arr[] = {1, 2, 3, 4};
+    const int* arr = _list0;
     int i = 0;
     while ((i < 4)) {
         printf("%d\n", arr[i]);
@@ -0,0 +1,37 @@
+#include <stdio.h>
+#include <string.h>
+
+static const int _list0[12] = {31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31};
+static const char _str0[] = "Mon";
+static const char _str1[] = "Tue";
+static const char _str2[] = "Wed";
+static const char _str3[] = "Thu";
+static const char _str4[] = "Fri";
+static const char _str5[] = "Sat";
+static const char _str6[] = "Sun";
+static const char* const _list1[7] = {_str0, _str1, _str2, _str3, _str4, _str5, _str6};
+static const double _list2[3] = {0.5, 0.25, 0.25};
+
+int day_length(int d);
+const char* day_name(int d);
+
+int day_length(int d) {
+    const int* lengths = _list0;
+    return lengths[d];
+}
+
+const char* day_name(int d) {
+    const char* const* names = _list1;
+    return names[d];
+}
+
+int main() {
+    int counts[] = {0, 0, 0};
+    counts[1] = day_length(1);
+    printf("%d\n", counts[1]);
+    printf("%s\n", day_name(2));
+    printf("%s\n", _str0);
+    const double* weights = _list2;
+    printf("%f\n", (weights[0] + weights[1]));
+    return 0;
+}
@@ -0,0 +1,41 @@
+#include <stdio.h>
+#include <string.h>
+
+double average(int a, int b);
+double half(int n);
+int is_even(int n);
+int is_odd(int n);
+
+double average(int a, int b) {
+    return half((a + b));
+}
+
+double half(int n) {
+    return (n / 2.0);
+}
+
+int is_even(int n) {
+    if ((n == 0)) {
+        return 1;
+    }
+    return is_odd((n - 1));
+}
+
+int is_odd(int n) {
+    if ((n == 0)) {
+        return 0;
+    }
+    return is_even((n - 1));
+}
+
+int main() {
+    printf("%f\n", average(3, 4));
+    printf("%d\n", is_even(10));
+    int x = 1;
+    if ((x > 0)) {
+        double x = 2.5;
+        printf("%f\n", x);
+    }
+    printf("%d\n", x);
+    return 0;
+}
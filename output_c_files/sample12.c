@@ -0,0 +1,17 @@
+#include <stdio.h>
+#include <string.h>
+
+int main() {
+    int x = 1;
+    {
+        int x = 2;
+        printf("%d\n", x);
+    }
+    printf("%d\n", x);
+    {
+        double x = 3.5;
+        printf("%f\n", x);
+    }
+    printf("%d\n", x);
+    return 0;
+}
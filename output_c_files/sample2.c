@@ -1,10 +1,15 @@
 #include <stdio.h>
 #include <string.h>
 
+static const char _str0[] = "hello";
+static const char _str1[] = "world";
+static const char* const _list0[2] = {_str0, _str1};
+static const char _str2[] = "";
+
 int main() {
     double pi = 3.14;
-    char* greetings[] = {"hello", "world"};
-    char* msg = "";
+    const char* const* greetings = _list0;
+    const char* msg = _str2;
     msg = greetings[0];
     printf("%s\n", msg);
     double val = (pi * 2.0);
@@ -1,6 +1,8 @@
 #include <stdio.h>
 #include <string.h>
 
+int haha(int x, int y);
+
 int haha(int x, int y) {
     x = (x + 1);
     y = (y + x);
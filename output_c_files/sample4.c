@@ -1,8 +1,10 @@
 #include <stdio.h>
 #include <string.h>
 
+static const char _str0[] = "x is less than 20";
+
 int main() {
-    printf("%s\n", "x is less than 20");
-    printf("%s\n", "x is less than 20");
+    printf("%s\n", _str0);
+    printf("%s\n", _str0);
     return 0;
 }
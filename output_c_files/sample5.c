@@ -1,16 +1,14 @@
 #include <stdio.h>
 #include <string.h>
 
+static const char _str0[] = "x is: ";
+
 int main() {
     int x = 0;
     while ((x < 5)) {
-        printf("%s\n", "x is: ");
+        printf("%s\n", _str0);
         printf("%d\n", x);
-        int y = -2;
         x = (x + 1);
     }
-    while (1) {
-        return 0;
-    }
     return 0;
 }
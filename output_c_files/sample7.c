@@ -0,0 +1,30 @@
+#include <stdio.h>
+#include <string.h>
+
+int square(int n);
+int sign(int n);
+
+int square(int n) {
+    return (n * n);
+}
+
+int sign(int n) {
+    if ((n < 0)) {
+        return -1;
+    }
+    else {
+        return 1;
+    }
+}
+
+int main() {
+    int total = 0;
+    int i = 0;
+    while ((i < 3)) {
+        total = (total + square(i));
+        i = (i + 1);
+    }
+    printf("%d\n", total);
+    printf("%d\n", sign(-7));
+    return 0;
+}
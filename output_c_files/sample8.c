@@ -0,0 +1,33 @@
+#include <stdio.h>
+#include <string.h>
+
+static const int _list0[4] = {3, 5, 7, 9};
+
+int area(int w, int h);
+
+int area(int w, int h) {
+    int _cse0 = (w * h);
+    int doubled = (_cse0 * 2);
+    int halved = ((_cse0 < 0 ? _cse0 + 3 : _cse0) >> 2);
+    return (doubled + halved);
+}
+
+int main() {
+    const int* data = _list0;
+    int i = 1;
+    int _cse2 = data[i];
+    int _cse1 = (_cse2 * _cse2);
+    int a = (_cse1 + 1);
+    int b = (_cse1 - 1);
+    printf("%d\n", (a * b));
+    i = (i + 1);
+    int c = data[i];
+    printf("%d\n", c);
+    double scale = 2.5;
+    printf("%f\n", (scale * 0));
+    printf("%d\n", area(3, 4));
+    printf("%d\n", -4);
+    int neg = -9;
+    printf("%d\n", ((neg < 0 ? neg + 1 : neg) >> 1));
+    return 0;
+}
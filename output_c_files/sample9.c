@@ -0,0 +1,47 @@
+#include <stdio.h>
+#include <string.h>
+
+static const char _str0[] = "noisy called";
+
+int cube(int n);
+int noisy(int n);
+
+int cube(int n) {
+    return ((n * n) * n);
+}
+
+int noisy(int n) {
+    printf("%s\n", _str0);
+    return n;
+}
+
+int main() {
+    int limit = 4;
+    int base = 3;
+    int scale = 2;
+    int total = 0;
+    int i = 0;
+    if ((i < (limit * scale))) {
+        int _licm0 = (limit * scale);
+        int _licm1 = (cube(base) + scale);
+        while ((i < _licm0)) {
+            int offset = _licm1;
+            total = ((total + offset) + (i * scale));
+            if ((i == 0)) {
+                int once = noisy(base);
+                printf("%d\n", once);
+            }
+            i = (i + 1);
+        }
+    }
+    printf("%d\n", total);
+    int j = 10;
+    if ((j < 5)) {
+        int _licm2 = cube(base);
+        while ((j < 5)) {
+            printf("%d\n", (_licm2 + j));
+            j = (j + 1);
+        }
+    }
+    return 0;
+}
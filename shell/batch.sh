@@ -0,0 +1,12 @@
+#!/bin/bash
+
+# Usage Check
+if [ "$#" -lt 1 ]; then
+    echo "Usage: ./batch.sh [options] <source_file.litel | directory> ..."
+    exit 1
+fi
+
+# Generate, compile and optionally run many files at once, overlapping the
+# Python front end with gcc and the compiled programs, e.g.
+# ./shell/batch.sh --expected tests/sample_code_generator_programs/sample_output.txt tests/sample_code_generator_programs
+python3 src/orchestrate.py "$@"
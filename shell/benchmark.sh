@@ -0,0 +1,6 @@
+#!/bin/bash
+
+# Compile every benchmark in ./benchmarks both from LiteLang and from its
+# hand-written C baseline, run them and report the runtime ratios.
+# Arguments are passed on, e.g. ./shell/benchmark.sh fib --cflags="-O0" --repeat 10
+python3 src/benchmark.py "$@"
@@ -0,0 +1,22 @@
+#!/bin/bash
+
+# Usage Check
+if [ "$#" -ne 1 ]; then
+    echo "Usage: ./build.sh <main_file.litel>"
+    exit 1
+fi
+
+INPUT_FILE=$1
+BASENAME=$(basename "$INPUT_FILE" .litel)
+BUILD_DIR=./build
+EXECUTABLE="$BUILD_DIR/$BASENAME"
+
+# Compile the modules whose source or imported interfaces changed, then link
+python3 src/build.py "$INPUT_FILE" --build-dir "$BUILD_DIR" -o "$EXECUTABLE"
+if [ $? -ne 0 ]; then
+    >&2 echo "Error: Build failed."
+    exit 1
+fi
+
+# Run the linked program and display its output
+"$EXECUTABLE"
@@ -36,7 +36,7 @@ if [ $? -ne 0 ] || [ -z "$AST" ]; then
 fi
 
 # Step 3: Generate C Code
-CODE=$(echo "$AST" | python3 src/code_generator.py 2>&1)
+CODE=$(echo "$AST" | python3 src/code_generator.py)
 if [ $? -ne 0 ]; then
     >&2 echo "Error: Code generation failed. Please check code_generator.py."
     exit 1
@@ -0,0 +1,62 @@
+#!/bin/bash
+
+# Usage Check
+if [ "$#" -ne 1 ]; then
+    echo "Usage: ./profile.sh <source_file.litel>"
+    exit 1
+fi
+
+INPUT_FILE=$1
+BASENAME=$(basename "$INPUT_FILE" .litel)
+OUTPUT_DIR=./output_c_files
+C_FILE="$OUTPUT_DIR/${BASENAME}_profile.c"
+PROFILE_FILE="$OUTPUT_DIR/${BASENAME}.profile.json"
+
+# Step 1: Run Lexer, keeping the line number of every token
+TOKENS=$(python3 src/scanner.py --lines "$INPUT_FILE" 2>&1)
+if [ $? -ne 0 ]; then
+    >&2 echo "Error: Lexer command failed. Please check scanner.py."
+    exit 1
+fi
+
+if echo "$TOKENS" | grep -q "Lexical error"; then
+    >&2 echo "Error: Lexical error detected. Aborting."
+    exit 1
+fi
+
+if [ -z "$TOKENS" ]; then
+    >&2 echo "Error: Lexer produced no output."
+    exit 1
+fi
+
+# Step 2: Run Parser
+AST=$(echo "$TOKENS" | python3 src/parser.py 2>/dev/null)
+if [ $? -ne 0 ] || [ -z "$AST" ]; then
+    >&2 echo "Error: Parser failed to generate AST. Please check parser.py."
+    exit 1
+fi
+
+# Step 3: Generate instrumented C Code
+CODE=$(echo "$AST" | python3 src/code_generator.py --profile "$INPUT_FILE")
+if [ $? -ne 0 ]; then
+    >&2 echo "Error: Code generation failed. Please check code_generator.py."
+    exit 1
+fi
+
+mkdir -p "$OUTPUT_DIR"
+echo "$CODE" > "$C_FILE"
+
+# Compile the instrumented C code
+gcc -o "$OUTPUT_DIR/${BASENAME}_profile.out" "$C_FILE"
+if [ $? -ne 0 ]; then
+    >&2 echo "Error: Compilation failed."
+    exit 1
+fi
+
+# Run the program; its exit handler writes the profile
+LITEL_PROFILE_OUT="$PROFILE_FILE" "$OUTPUT_DIR/${BASENAME}_profile.out"
+rm "$OUTPUT_DIR/${BASENAME}_profile.out"
+
+# Render the hottest functions and loops
+echo
+python3 src/profile_report.py "$PROFILE_FILE"
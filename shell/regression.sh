@@ -0,0 +1,6 @@
+#!/bin/bash
+
+# Check every sample against its suite's sample_output.txt and compare the time
+# and memory of each compiler stage with the recorded baseline.
+# Record a baseline first with ./shell/regression.sh --update
+python3 src/regression.py "$@"
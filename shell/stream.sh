@@ -0,0 +1,34 @@
+#!/bin/bash
+
+# Usage Check
+if [ "$#" -ne 1 ]; then
+    echo "Usage: ./stream.sh <source_file.litel>"
+    exit 1
+fi
+
+INPUT_FILE=$1
+BASENAME=$(basename "$INPUT_FILE" .litel)
+OUTPUT_DIR=./output_c_files
+C_FILE="$OUTPUT_DIR/${BASENAME}_stream.c"
+
+mkdir -p "$OUTPUT_DIR"
+
+# Scan, then parse and generate C one top-level statement at a time
+python3 src/stream.py "$INPUT_FILE" "$C_FILE"
+if [ $? -ne 0 ]; then
+    >&2 echo "Error: Code generation failed."
+    exit 1
+fi
+
+# Compile the generated C code
+gcc -o "$OUTPUT_DIR/${BASENAME}_a.out" "$C_FILE"
+if [ $? -ne 0 ]; then
+    >&2 echo "Error: Compilation failed."
+    exit 1
+fi
+
+# Run the compiled program and display its output
+"$OUTPUT_DIR/${BASENAME}_a.out"
+
+# Remove the compiled binary so that only the .c file remains
+rm "$OUTPUT_DIR/${BASENAME}_a.out"
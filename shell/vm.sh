@@ -0,0 +1,10 @@
+#!/bin/bash
+
+# Usage Check
+if [ "$#" -ne 1 ]; then
+    echo "Usage: ./vm.sh <source_file.litel>"
+    exit 1
+fi
+
+# Compile to bytecode and run it in-process, without generating C or invoking gcc
+python3 src/vm.py "$1"
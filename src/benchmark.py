@@ -0,0 +1,107 @@
+import os
+import sys
+import time
+import glob
+import shlex
+import argparse
+import subprocess
+import contextlib
+from scanner import Scanner, read_input_file
+from parser import Parser
+from code_generator import CodeGenerator
+
+
+def generate_c(path):
+    # Run the same pipeline as code_generator.sh, in-process
+    scanner = Scanner()
+    with contextlib.redirect_stdout(sys.stderr):
+        tokens = scanner.scan(read_input_file(path) + ' ')
+    if tokens is None:
+        raise Exception(f"Error: Lexical error detected in {path}.")
+    ast = Parser(tokens, symbols=scanner.symbols).parse()
+    return CodeGenerator(ast, interner=scanner.symbols).generate_code()
+
+
+def compile_c(c_file, executable, cflags):
+    result = subprocess.run(["gcc"] + cflags + ["-o", executable, c_file], stderr=subprocess.PIPE, text=True)
+    if result.returncode != 0:
+        sys.stderr.write(result.stderr)
+        raise Exception(f"Error: Compilation of {c_file} failed.")
+
+
+def time_executable(executable, repeat):
+    # Returns the program's output and its fastest wall-clock time in seconds;
+    # the minimum is the run least disturbed by the rest of the machine
+    best = None
+    output = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = subprocess.run([executable], stdout=subprocess.PIPE, text=True)
+        elapsed = time.perf_counter() - start
+        if result.returncode != 0:
+            raise Exception(f"Error: {executable} exited with status {result.returncode}.")
+        output = result.stdout
+        best = elapsed if best is None else min(best, elapsed)
+    return output, best
+
+
+def run_benchmark(name, benchmark_dir, build_dir, cflags, repeat):
+    generated_c = os.path.join(build_dir, f"{name}.c")
+    with open(generated_c, "w") as f:
+        f.write(generate_c(os.path.join(benchmark_dir, f"{name}.litel")))
+    generated = os.path.join(build_dir, f"{name}_generated")
+    baseline = os.path.join(build_dir, f"{name}_baseline")
+    compile_c(generated_c, generated, cflags)
+    compile_c(os.path.join(benchmark_dir, f"{name}.c"), baseline, cflags)
+
+    generated_output, generated_time = time_executable(generated, repeat)
+    baseline_output, baseline_time = time_executable(baseline, repeat)
+    return {
+        "name": name,
+        "generated": generated_time,
+        "baseline": baseline_time,
+        "ratio": generated_time / baseline_time,
+        "matches": generated_output == baseline_output,
+    }
+
+
+def format_results(results):
+    lines = [f"{'benchmark':<16}{'generated (ms)':>16}{'hand-written (ms)':>20}{'ratio':>8}"]
+    for result in results:
+        line = (f"{result['name']:<16}{result['generated'] * 1000:>16.1f}"
+                f"{result['baseline'] * 1000:>20.1f}{result['ratio']:>8.2f}")
+        if not result["matches"]:
+            line += "  OUTPUT MISMATCH"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def main():
+    argparser = argparse.ArgumentParser(description="Compare generated C against hand-written C baselines.")
+    argparser.add_argument("names", nargs="*", help="benchmarks to run (default: all)")
+    argparser.add_argument("--benchmark-dir", default="benchmarks", help="where <name>.litel and <name>.c pairs live")
+    argparser.add_argument("--build-dir", default=os.path.join("build", "benchmarks"))
+    argparser.add_argument("--cflags", default="-O2", help="gcc flags used for both versions, e.g. --cflags=\"-O0 -march=native\"")
+    argparser.add_argument("--repeat", type=int, default=5, help="runs per executable; the fastest is reported")
+    args = argparser.parse_args()
+
+    names = args.names or sorted(os.path.splitext(os.path.basename(path))[0]
+                                 for path in glob.glob(os.path.join(args.benchmark_dir, "*.litel")))
+    os.makedirs(args.build_dir, exist_ok=True)
+    cflags = shlex.split(args.cflags)
+    results = []
+    try:
+        for name in names:
+            results.append(run_benchmark(name, args.benchmark_dir, args.build_dir, cflags, args.repeat))
+    except Exception as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+
+    print(f"gcc {args.cflags}, fastest of {args.repeat} runs")
+    print(format_results(results))
+    if not all(result["matches"] for result in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+import os
+import sys
+import json
+import hashlib
+import argparse
+import subprocess
+import contextlib
+from scanner import Scanner, read_input_file
+from parser import Parser
+from code_generator import CodeGenerator
+
+
+class BuildError(Exception):
+    pass
+
+
+def source_hash(code):
+    return hashlib.sha256(code.encode("utf-8")).hexdigest()
+
+
+def interface_hash(functions):
+    # Dependents only need rebuilding when the signatures they compiled against change
+    return hashlib.sha256(json.dumps(functions, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class Module:
+    def __init__(self, name, path, code):
+        self.name = name
+        self.path = path
+        self.code = code
+        self.hash = source_hash(code)
+        self.imports = []
+        self.ast = None
+        self.symbols = None
+        # The interface file from the previous build, if it is still usable
+        self.cached = None
+
+
+class Builder:
+    # Builds a multi-file program. Every module is compiled to its own .c and .o
+    # file in the build directory, next to an interface file (.lli) recording the
+    # module's source hash, the interfaces it was compiled against and the
+    # signatures of the functions it exports. A module is only recompiled when its
+    # source changed or one of the interfaces it imports changed.
+    def __init__(self, build_dir, log=None):
+        self.build_dir = build_dir
+        self.log = log if log is not None else sys.stderr
+        self.modules = {}
+        self.order = []
+        self.compiled = []
+
+    def build(self, entry_path, output):
+        source_dir = os.path.dirname(entry_path)
+        entry_name = os.path.splitext(os.path.basename(entry_path))[0]
+        os.makedirs(self.build_dir, exist_ok=True)
+        self.modules = {}
+        self.order = []
+        self.compiled = []
+        self.resolve(entry_name, source_dir, [])
+
+        interfaces = {}
+        for module in self.order:
+            entry = module.name == entry_name
+            if self.is_stale(module, entry, interfaces):
+                interfaces[module.name] = self.compile(module, entry, interfaces)
+                self.compiled.append(module.name)
+            else:
+                interfaces[module.name] = module.cached
+                print(f"Up to date: {module.name}", file=self.log)
+        self.link(interfaces, output)
+        return self.compiled
+
+    def path(self, name, extension):
+        return os.path.join(self.build_dir, name + extension)
+
+    def resolve(self, name, source_dir, importing):
+        # Depth-first walk of the import graph; modules are ordered so that every
+        # module comes after the modules it imports
+        if name in importing:
+            raise BuildError(f"Error: Import cycle: {' -> '.join(importing[importing.index(name):] + [name])}")
+        if name in self.modules:
+            return
+        path = os.path.join(source_dir, name + ".litel")
+        if not os.path.exists(path):
+            raise BuildError(f"Error: Module '{name}' not found at {path}")
+        module = Module(name, path, read_input_file(path))
+        module.cached = self.load_interface(name)
+        if module.cached is not None and module.cached["source"] == module.hash:
+            # Unchanged sources are not even parsed; their imports are in the interface
+            module.imports = list(module.cached["imports"])
+        else:
+            self.parse(module)
+            module.imports = [stmt["Import"] for stmt in module.ast["Program"] if "Import" in stmt]
+        self.modules[name] = module
+        for imported in module.imports:
+            self.resolve(imported, source_dir, importing + [name])
+        self.order.append(module)
+
+    def load_interface(self, name):
+        path = self.path(name, ".lli")
+        if not os.path.exists(path) or not os.path.exists(self.path(name, ".o")):
+            return None
+        with open(path, "r") as f:
+            return json.load(f)
+
+    def parse(self, module):
+        scanner = Scanner()
+        # The scanner reports lexical errors on stdout, which is not ours to write to.
+        # A whitespace is appended to the end of the code to ensure proper token detection.
+        with contextlib.redirect_stdout(self.log):
+            tokens = scanner.scan(module.code + ' ')
+        if tokens is None:
+            raise BuildError(f"Error: Lexical error detected in {module.path}. Aborting.")
+        try:
+            module.ast = Parser(tokens, symbols=scanner.symbols).parse()
+        except SyntaxError as e:
+            raise BuildError(f"Syntax Error in {module.path}: {e}")
+        module.symbols = scanner.symbols
+
+    def is_stale(self, module, entry, interfaces):
+        cached = module.cached
+        if cached is None or cached["source"] != module.hash or cached["entry"] != entry:
+            return True
+        return any(interface_hash(interfaces[name]["functions"]) != recorded
+                   for name, recorded in cached["imports"].items())
+
+    def compile(self, module, entry, interfaces):
+        print(f"Compiling {module.name}", file=self.log)
+        if module.ast is None:
+            self.parse(module)
+        imports = {name: interfaces[name] for name in module.imports}
+        generator = CodeGenerator(module.ast, interner=module.symbols, imports=imports, library=not entry)
+        try:
+            c_code = generator.generate_code()
+        except Exception as e:
+            raise BuildError(f"{e} (in {module.path})")
+
+        c_file = self.path(module.name, ".c")
+        o_file = self.path(module.name, ".o")
+        with open(c_file, "w") as f:
+            f.write(c_code)
+        result = subprocess.run(["gcc", "-c", "-o", o_file, c_file], stderr=subprocess.PIPE, text=True)
+        if result.returncode != 0:
+            self.log.write(result.stderr)
+            raise BuildError(f"Error: Compilation of {c_file} failed.")
+
+        functions = {}
+        if not entry:
+            for stmt in module.ast["Program"]:
+                if "FunctionDef" in stmt:
+                    name = stmt["FunctionDef"]["Name"]
+                    functions[name] = {"return": generator.function_return_type[name],
+                                       "parameters": len(stmt["FunctionDef"]["Parameters"])}
+        interface = {
+            "module": module.name,
+            "source": module.hash,
+            "entry": entry,
+            "imports": {name: interface_hash(interfaces[name]["functions"]) for name in module.imports},
+            "functions": functions,
+        }
+        with open(self.path(module.name, ".lli"), "w") as f:
+            json.dump(interface, f, indent=4)
+        return interface
+
+    def link(self, interfaces, output):
+        exporters = {}
+        for module in self.order:
+            for name in interfaces[module.name]["functions"]:
+                if name in exporters:
+                    raise BuildError(f"Error: Function '{name}' is defined in both {exporters[name]} and {module.name}.")
+                exporters[name] = module.name
+        print(f"Linking {output}", file=self.log)
+        objects = [self.path(module.name, ".o") for module in self.order]
+        result = subprocess.run(["gcc", "-o", output] + objects, stderr=subprocess.PIPE, text=True)
+        if result.returncode != 0:
+            self.log.write(result.stderr)
+            raise BuildError("Error: Linking failed.")
+
+
+def main():
+    argparser = argparse.ArgumentParser(description="Build a multi-file LiteLang program.")
+    argparser.add_argument("entry", help="the .litel file holding the top-level program")
+    argparser.add_argument("--build-dir", default="build", help="where .c, .o and interface files are kept between builds")
+    argparser.add_argument("-o", "--output", help="path of the linked executable (default: <build-dir>/<entry>)")
+    args = argparser.parse_args()
+
+    output = args.output or os.path.join(args.build_dir, os.path.splitext(os.path.basename(args.entry))[0])
+    try:
+        Builder(args.build_dir).build(args.entry, output)
+    except BuildError as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,344 @@
+import sys
+import json
+import codecs
+from array import array
+from symbols import infer_function_signatures
+
+# Every instruction is two words in a function's code array: the opcode
+# followed by a single operand (0 for opcodes that do not take one)
+LOAD_CONST = 0       # push constants[operand]
+LOAD_LOCAL = 1       # push locals[operand]
+STORE_LOCAL = 2      # pop into locals[operand]
+INDEX = 3            # pop index, pop list, push list[index]
+STORE_INDEX = 4      # pop value, pop index, locals[operand][index] = value
+ADD = 5
+SUB = 6
+MUL = 7
+DIV_INT = 8          # C integer division, truncating toward zero
+DIV_FLOAT = 9
+LT = 10
+GT = 11
+LE = 12
+GE = 13
+EQ = 14
+NE = 15
+NEG = 16
+TO_INT = 17          # truncate the float on top of the stack, as a C conversion to int would
+JUMP = 18            # continue at word operand
+JUMP_IF_FALSE = 19   # pop, continue at word operand if zero
+CALL = 20            # call functions[operand]; its arguments are on the stack
+RETURN = 21          # return the value on top of the stack to the caller
+POP = 22
+PRINT_INT = 23
+PRINT_FLOAT = 24
+PRINT_STR = 25
+MAKE_LIST = 26       # pop operand values and push them as a list
+
+OPCODE_NAMES = {value: name for name, value in list(globals().items()) if name.isupper() and isinstance(value, int)}
+
+BINARY_OPCODES = {"+": ADD, "-": SUB, "*": MUL, "<": LT, ">": GT, "<=": LE, ">=": GE, "==": EQ, "!=": NE}
+
+
+class Function:
+    def __init__(self, name, num_params):
+        self.name = name
+        self.num_params = num_params
+        self.num_locals = num_params
+        self.code = array('i')
+        self.defined = False
+
+
+class BytecodeCompiler:
+    def __init__(self, ast):
+        self.ast = ast
+        self.constants = []
+        self.constant_index = {}
+        self.functions = []
+        self.function_index = {}
+        self.function_return_type = {}
+        self.function = None
+        # Stack of block scopes mapping a name to its (slot, type)
+        self.scopes = []
+        self.current_function_return_type = None
+
+    def compile(self):
+        # Returns the constant pool, the function table and the index of the
+        # function holding the top-level program
+        if "Program" not in self.ast:
+            raise Exception("AST does not have a Program node.")
+        self.function_return_type = infer_function_signatures(self.ast["Program"])
+        main = self.declare_function("main", 0)
+        self.function = main
+        self.scopes = [{}]
+        for stmt in self.ast["Program"]:
+            self.visit(stmt)
+        self.emit(LOAD_CONST, self.constant(0))
+        self.emit(RETURN)
+        main.defined = True
+
+        for function in self.functions:
+            if not function.defined:
+                raise Exception(f"Error: Function '{function.name}' is called but never defined.")
+        return self.constants, self.functions, self.function_index["main"]
+
+    # Emission helpers
+
+    def emit(self, opcode, operand=0):
+        self.function.code.append(opcode)
+        self.function.code.append(operand)
+        return len(self.function.code) - 1
+
+    def patch(self, operand_position, target):
+        self.function.code[operand_position] = target
+
+    def here(self):
+        return len(self.function.code)
+
+    def constant(self, value):
+        # Constants are pooled by type and value, so 1 and 1.0 stay distinct
+        key = (type(value), value)
+        if key not in self.constant_index:
+            self.constant_index[key] = len(self.constants)
+            self.constants.append(value)
+        return self.constant_index[key]
+
+    def declare_function(self, name, num_params):
+        if name not in self.function_index:
+            self.function_index[name] = len(self.functions)
+            self.functions.append(Function(name, num_params))
+        return self.functions[self.function_index[name]]
+
+    def declare_variable(self, name, var_type):
+        slot = self.function.num_locals
+        self.function.num_locals += 1
+        self.scopes[-1][name] = (slot, var_type)
+        return slot
+
+    def lookup(self, name):
+        for scope in reversed(self.scopes):
+            if name in scope:
+                return scope[name]
+        raise Exception(f"Error: Variable '{name}' is used before it is declared.")
+
+    # Statements
+
+    def visit(self, node):
+        if not isinstance(node, dict):
+            raise Exception(f"Node is not a dict: {node}")
+        if len(node.keys()) != 1:
+            raise Exception(f"Node has multiple keys: {node.keys()}")
+
+        node_type = list(node.keys())[0]
+        visitor = getattr(self, f"visit_{node_type}", self.generic_visit)
+        return visitor(node[node_type])
+
+    def generic_visit(self, node_value):
+        raise Exception(f"No visitor method defined for {node_value}")
+
+    def visit_block(self, statements):
+        self.scopes.append({})
+        for stmt in statements:
+            self.visit(stmt)
+        self.scopes.pop()
+
+    def visit_VarDeclaration(self, node):
+        expr_type = self.compile_expression(node["Expression"])
+        slot = self.declare_variable(node["Identifier"], expr_type)
+        self.emit(STORE_LOCAL, slot)
+
+    def visit_Assignment(self, node):
+        assignable = node["Assignable"]
+        if "IndexedIdentifier" in assignable:
+            slot, var_type = self.lookup(assignable["IndexedIdentifier"]["Identifier"])
+            self.compile_expression(assignable["IndexedIdentifier"]["Index"])
+            expr_type = self.compile_expression(node["Expression"])
+            self.convert(expr_type, var_type.replace("[]", ""))
+            self.emit(STORE_INDEX, slot)
+        else:
+            slot, var_type = self.lookup(assignable["Identifier"])
+            expr_type = self.compile_expression(node["Expression"])
+            self.convert(expr_type, var_type)
+            self.emit(STORE_LOCAL, slot)
+
+    def visit_Output(self, node):
+        expr_type = self.compile_expression(node)
+        if expr_type == "int":
+            self.emit(PRINT_INT)
+        elif expr_type == "float":
+            self.emit(PRINT_FLOAT)
+        else:
+            self.emit(PRINT_STR)
+
+    def visit_Return(self, node):
+        expr_type = self.compile_expression(node)
+        if self.function.name != "main":
+            if self.current_function_return_type is None:
+                self.current_function_return_type = expr_type
+            elif self.current_function_return_type != expr_type:
+                raise Exception("Error: Multiple return types in function body are not consistent.")
+            if "[]" in self.current_function_return_type:
+                raise Exception("Error: Returning arrays is not allowed.")
+        self.emit(RETURN)
+
+    def visit_FunctionCallStatement(self, node):
+        self.compile_call(node)
+        self.emit(POP)
+
+    def visit_IfStatement(self, node):
+        self.compile_expression(node["Condition"])
+        to_else = self.emit(JUMP_IF_FALSE)
+        self.visit_block(node["Then"]["Block"])
+        if node["Else"] is not None:
+            to_end = self.emit(JUMP)
+            self.patch(to_else, self.here())
+            self.visit_block(node["Else"]["Block"])
+            self.patch(to_end, self.here())
+        else:
+            self.patch(to_else, self.here())
+
+    def visit_Loop(self, node):
+        start = self.here()
+        self.compile_expression(node["Condition"])
+        to_end = self.emit(JUMP_IF_FALSE)
+        self.visit_block(node["Block"]["Block"])
+        self.emit(JUMP, start)
+        self.patch(to_end, self.here())
+
+    def visit_FunctionDef(self, node):
+        name = node["Name"]
+        parameters = node["Parameters"]
+        function = self.declare_function(name, len(parameters))
+        if function.defined:
+            raise Exception(f"Error: Function '{name}' is defined more than once.")
+        function.num_params = len(parameters)
+        function.num_locals = 0
+
+        old_function = self.function
+        old_scopes = self.scopes
+        old_return_type = self.current_function_return_type
+
+        # Functions only see their own parameters, which are C ints
+        self.function = function
+        self.scopes = [{}]
+        self.current_function_return_type = None
+        for parameter in parameters:
+            self.declare_variable(parameter, "int")
+        for stmt in node["Body"]["Block"]:
+            self.visit(stmt)
+        self.emit(LOAD_CONST, self.constant(0))
+        self.emit(RETURN)
+        function.defined = True
+        self.function_return_type[name] = self.current_function_return_type or "int"
+
+        self.function = old_function
+        self.scopes = old_scopes
+        self.current_function_return_type = old_return_type
+
+    def visit_Import(self, node):
+        raise Exception(f"Error: Cannot import '{node}'; multi-file programs are built with build.py.")
+
+    def visit_EmptyStatement(self, node):
+        pass
+
+    def visit_Block(self, node):
+        self.visit_block(node["Block"])
+
+    # Expressions
+
+    def compile_expression(self, expr):
+        # Emit code leaving the value of expr on the stack and return its type
+        node_type = list(expr.keys())[0]
+        node_value = expr[node_type]
+
+        if node_type == "IntegerLiteral":
+            self.emit(LOAD_CONST, self.constant(int(node_value)))
+            return "int"
+        elif node_type == "FloatLiteral":
+            self.emit(LOAD_CONST, self.constant(float(node_value)))
+            return "float"
+        elif node_type == "StringLiteral":
+            self.emit(LOAD_CONST, self.constant(self.decode_string(node_value)))
+            return "string"
+        elif node_type == "Identifier":
+            slot, var_type = self.lookup(node_value)
+            self.emit(LOAD_LOCAL, slot)
+            return var_type
+        elif node_type == "IndexedIdentifier":
+            slot, var_type = self.lookup(node_value["Identifier"])
+            self.emit(LOAD_LOCAL, slot)
+            self.compile_expression(node_value["Index"])
+            self.emit(INDEX)
+            return var_type.replace("[]", "")
+        elif node_type == "FunctionCall":
+            return self.compile_call(node_value)
+        elif node_type in ("Term", "ArithmeticExpression"):
+            left_type = self.compile_expression(node_value["Left"])
+            right_type = self.compile_expression(node_value["Right"])
+            result_type = "float" if "float" in (left_type, right_type) else "int"
+            op = node_value["Operator"]
+            if op == "/":
+                self.emit(DIV_FLOAT if result_type == "float" else DIV_INT)
+            else:
+                self.emit(BINARY_OPCODES[op])
+            return result_type
+        elif node_type == "RelationalExpression":
+            self.compile_expression(node_value["Left"])
+            self.compile_expression(node_value["Right"])
+            self.emit(BINARY_OPCODES[node_value["Operator"]])
+            return "int"
+        elif node_type == "UnaryExpression":
+            operand_type = self.compile_expression(node_value["Operand"])
+            self.emit(NEG)
+            return operand_type
+        elif node_type == "ListExpression":
+            for elem in node_value["Elements"]:
+                self.compile_expression(elem)
+            self.emit(MAKE_LIST, len(node_value["Elements"]))
+            return (node_value["Type"] or "int") + "[]"
+        else:
+            raise Exception(f"Unknown expression node type: {node_type}")
+
+    def compile_call(self, node):
+        name = node["Name"]
+        function = self.declare_function(name, len(node["Arguments"]))
+        if len(node["Arguments"]) != function.num_params:
+            raise Exception(f"Error: Function '{name}' expects {function.num_params} arguments.")
+        for arg in node["Arguments"]:
+            # Parameters are C ints, so float arguments are truncated
+            self.convert(self.compile_expression(arg), "int")
+        self.emit(CALL, self.function_index[name])
+        return self.function_return_type.get(name, "int")
+
+    def convert(self, from_type, to_type):
+        if from_type == "float" and to_type == "int":
+            self.emit(TO_INT)
+
+    def decode_string(self, literal):
+        value = literal[1:-1] if literal.startswith('"') and literal.endswith('"') else literal
+        # Escape sequences mean the same as they would in the generated C literal
+        if "\\" in value:
+            value = codecs.decode(value, "unicode_escape")
+        return value
+
+
+def disassemble(constants, functions):
+    lines = []
+    for function in functions:
+        lines.append(f"{function.name} (params: {function.num_params}, locals: {function.num_locals}):")
+        code = function.code
+        for pc in range(0, len(code), 2):
+            opcode, operand = code[pc], code[pc + 1]
+            name = OPCODE_NAMES[opcode]
+            if opcode == LOAD_CONST:
+                lines.append(f"    {pc:>5}  {name:<14}{operand} ({constants[operand]!r})")
+            elif opcode == CALL:
+                lines.append(f"    {pc:>5}  {name:<14}{operand} ({functions[operand].name})")
+            else:
+                lines.append(f"    {pc:>5}  {name:<14}{operand}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    ast = json.load(sys.stdin)
+    constants, functions, entry = BytecodeCompiler(ast).compile()
+    print(disassemble(constants, functions))
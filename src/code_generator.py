@@ -1,16 +1,56 @@
+import re
 import sys
 import json
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from optimizer import DeadCodeEliminator, LoopInvariantCodeMotion, CommonSubexpressionEliminator, is_pure
+from symbols import SymbolTable, infer_function_signatures, collect_functions
+
+# Programs with fewer top-level functions than this are always generated sequentially
+PARALLEL_FUNCTIONS = 64
+POOL_NAME = re.compile(r"\b_(?:str|list)\d+\b")
 
 class CodeGenerator:
-    def __init__(self, ast):
+    def __init__(self, ast, profile_source=None, interner=None, imports=None, library=False, jobs=None):
         self.ast = ast
+        # Number of processes optimizing and generating functions; None uses only this one
+        self.jobs = jobs
+        # Set while generating one top-level statement at a time, see generate_stream
+        self.streaming = False
+        # Functions called before their definition in streaming mode, assumed to return int
+        self.assumed_functions = set()
+        # Interfaces of imported modules, mapping each module name to its exported
+        # functions' return types and parameter counts
+        self.imports = imports if imports is not None else {}
+        # A library module is compiled without main and keeps every top-level function
+        self.library = library
+        # Name of the .litel file when building an instrumented profiling binary
+        self.profile_source = profile_source
+        self.profile_regions = []
+        self.profile_loops = []
+        # Source line of the last #line directive, in profiling builds
+        self.source_line = None
+        self.current_function_name = "main"
         self.main_code = ""
         self.functions_code = ""
         self.indent_level = 1
-        self.variables = {}
+        # Variable types, scoped by block and function. The AST holds names, which the
+        # table maps to ids; passing the scanner's interner in reuses the ids it assigned
+        self.symbols = SymbolTable(interner)
         self.function_return_type = {}
+        self.function_prototypes = ""
         self.in_function_definition = False
         self.current_function_return_type = None
+        self.removed_code = []
+        self.hoisted_code = []
+        self.string_pool = {}
+        self.string_names = set()
+        self.list_pool = {}
+        self.pool_code = ""
+        # Pooled constants in order of creation, as (name, kind, value)
+        self.pool_entries = []
+        self.assigned_names = set()
 
     def indent(self):
         return "    " * self.indent_level
@@ -18,26 +58,184 @@ class CodeGenerator:
     def generate_code(self):
         if "Program" not in self.ast:
             raise Exception("AST does not have a Program node.")
-        program_body = self.ast["Program"]
-
+        imported = self.imported_functions()
+        exported = self.exported_functions()
+        for name in exported:
+            if name in imported:
+                raise Exception(f"Error: Function '{name}' is already imported from another module.")
+        eliminator = DeadCodeEliminator(exported if self.library else frozenset())
+        licm = LoopInvariantCodeMotion()
+        cse = CommonSubexpressionEliminator()
+        program_body = eliminator.prune(self.ast)["Program"]
+        generated_functions = None
+        functions = [stmt for stmt in program_body if "FunctionDef" in stmt]
+        if self.jobs and self.jobs > 1 and self.profile_source is None and len(functions) >= PARALLEL_FUNCTIONS:
+            with ProcessPoolExecutor(max_workers=self.jobs) as executor:
+                program_body = self.optimize_in_parallel(executor, program_body, functions, eliminator, licm, cse)
+                self.analyze_program(program_body, imported)
+                generated_functions = iter(self.run_in_batches(
+                    executor, generate_functions, [stmt for stmt in program_body if "FunctionDef" in stmt],
+                    self.function_return_type, self.assigned_names))
+        else:
+            program_body = eliminator.drop_dead_variables(program_body, "main")
+            program_body = cse.eliminate(licm.optimize({"Program": program_body}))["Program"]
+            self.analyze_program(program_body, imported)
+        self.removed_code = eliminator.removed
+        self.hoisted_code = licm.hoisted + cse.hoisted
+
+        for name, function in imported.items():
+            params_code = ", ".join(["int"] * function["parameters"]) or "void"
+            self.function_prototypes += f"{self.map_type(function['return'])} {name}({params_code});\n"
         for stmt in program_body:
-            self.visit(stmt, in_main=True)
+            if generated_functions is not None and "FunctionDef" in stmt:
+                self.add_generated_function(*next(generated_functions))
+            else:
+                self.visit(stmt, in_main=True)
 
         c_code = "#include <stdio.h>\n#include <string.h>\n\n"
+        if self.pool_code:
+            c_code += self.pool_code + "\n"
+        if self.profile_source is not None:
+            c_code += self.profile_runtime()
+        if self.function_prototypes:
+            c_code += self.function_prototypes + "\n"
         c_code += self.functions_code
+        if self.library:
+            return c_code
+        if self.profile_source is not None:
+            # The top-level program starts at the top of the source
+            c_code += self.line_directive({"Line": 1})
         c_code += "int main() {\n"
+        if self.profile_source is not None:
+            c_code += "    _prof_program_start = _prof_now();\n"
+            c_code += "    atexit(_prof_report);\n"
         c_code += self.main_code
         c_code += "    return 0;\n}\n"
         return c_code
 
+    def generate_stream(self, statements, out):
+        # Generate C for top-level statements one at a time, writing each one to out as
+        # soon as it is generated, so that neither the whole AST nor the whole C file is
+        # ever held in memory. The statements of main are spooled to a temporary file
+        # and copied to the end of out. The whole-program optimizations are skipped, and
+        # a call to a function that is defined later assumes it returns int.
+        self.streaming = True
+        out.write("#include <stdio.h>\n#include <string.h>\n\n")
+        with tempfile.TemporaryFile("w+") as main_body:
+            for stmt in statements:
+                if "FunctionDef" in stmt:
+                    infer_function_signatures([stmt], self.symbols.interner, signatures=self.function_return_type)
+                    for function in collect_functions([stmt], []):
+                        name = function["Name"]
+                        if name in self.assumed_functions and self.function_return_type[name] != "int":
+                            raise Exception(f"Error: Function '{name}' is called before its definition, which returns "
+                                            f"{self.function_return_type[name]}; define it before the call to stream this program.")
+                # Names assigned in a function are all inside its definition
+                self.assigned_names = self.collect_assigned_names(stmt, set())
+                prototypes = self.declare_called_functions(stmt)
+                self.visit(stmt, in_main=True)
+
+                out.write(self.pool_code + prototypes + self.functions_code)
+                main_body.write(self.main_code)
+                self.pool_code = ""
+                self.functions_code = ""
+                self.function_prototypes = ""
+                self.main_code = ""
+            out.write("int main() {\n")
+            main_body.seek(0)
+            shutil.copyfileobj(main_body, out)
+        out.write("    return 0;\n}\n")
+
+    def declare_called_functions(self, node):
+        # Prototypes for functions called before they are defined
+        prototypes = ""
+        if isinstance(node, dict):
+            for key, value in node.items():
+                if key in ("FunctionCall", "FunctionCallStatement"):
+                    name = value["Name"]
+                    if name not in self.function_return_type and name not in self.assumed_functions:
+                        self.assumed_functions.add(name)
+                        params_code = ", ".join(["int"] * len(value["Arguments"])) or "void"
+                        prototypes += f"int {name}({params_code});\n"
+                prototypes += self.declare_called_functions(value)
+        elif isinstance(node, list):
+            for item in node:
+                prototypes += self.declare_called_functions(item)
+        return prototypes
+
+    def analyze_program(self, program_body, imported):
+        self.assigned_names = self.collect_assigned_names(program_body, set())
+        self.function_return_type = infer_function_signatures(
+            program_body, self.symbols.interner, {name: function["return"] for name, function in imported.items()})
+
+    def optimize_in_parallel(self, executor, program_body, functions, eliminator, licm, cse):
+        # Liveness, LICM and CSE look at one function at a time, so each top-level function
+        # goes through all three in a worker. The passes then run over the program as
+        # usual, taking each function back where they would have reached it, and number
+        # its temporaries on from the ones before it, as a sequential run would.
+        licm.pure_functions = licm.find_pure_functions(program_body)
+        results = self.run_in_batches(executor, optimize_functions, functions, licm.pure_functions)
+        program_body = eliminator.drop_dead_variables(
+            program_body, "main", iter([(function, removed) for function, removed, _, _ in results]))
+        program_body = licm.optimize_block(program_body, "main", iter([hoisted for _, _, hoisted, _ in results]))
+        return cse.optimize_block(program_body, "main", iter([hoisted for _, _, _, hoisted in results]))
+
+    def run_in_batches(self, executor, worker, functions, *shared):
+        # A few batches per process keep the workers busy without pickling the
+        # shared arguments once per function. Results come back in source order.
+        batch_count = self.jobs * 4
+        size = -(-len(functions) // batch_count)
+        batches = [functions[start:start + size] for start in range(0, len(functions), size)]
+        results = executor.map(worker, batches, *[[argument] * len(batches) for argument in shared])
+        return [result for batch in results for result in batch]
+
+    def add_generated_function(self, functions_code, prototypes, pool_entries, return_types):
+        # The worker numbered its pooled constants from zero; pool them here, in the
+        # order the worker created them, and rename them to the names they get here
+        names = {}
+        rename = lambda code: POOL_NAME.sub(lambda match: names[match.group()], code)
+        for name, kind, value in pool_entries:
+            if kind == "string":
+                names[name] = self.pool_string(value)
+            else:
+                c_type, elements = value
+                names[name] = self.pool_list(c_type, [rename(element) for element in elements])
+        self.functions_code += rename(functions_code)
+        self.function_prototypes += prototypes
+        self.function_return_type.update(return_types)
+
+    def imported_functions(self):
+        imported = {}
+        for module, interface in self.imports.items():
+            for name, function in interface["functions"].items():
+                if name in imported:
+                    raise Exception(f"Error: Function '{name}' is exported by more than one imported module.")
+                imported[name] = function
+        return imported
+
+    def exported_functions(self):
+        # Every top-level function is exported; an imported module may contain nothing else
+        exported = set()
+        for stmt in self.ast["Program"]:
+            kind = list(stmt.keys())[0]
+            if kind == "FunctionDef":
+                exported.add(stmt[kind]["Name"])
+            elif self.library and kind not in ("Import", "EmptyStatement"):
+                raise Exception(f"Error: Imported modules may only contain function definitions, found {kind}.")
+        return exported
+
     def visit(self, node, in_main=False):
         if not isinstance(node, dict):
             raise Exception(f"Node is not a dict: {node}")
-        if len(node.keys()) != 1:
+        # A statement whose node is an expression keeps its source line next to its kind
+        if len(node.keys()) != 1 and list(node.keys())[1:] != ["Line"]:
             raise Exception(f"Node has multiple keys: {node.keys()}")
 
         node_type = list(node.keys())[0]
         node_value = node[node_type]
+        # Functions and loops place their own, around the code profiling adds to them
+        if self.profile_source is not None and node_type not in ("FunctionDef", "Loop"):
+            self.append_code(self.line_directive(node), in_main)
         method_name = f"visit_{node_type}"
         visitor = getattr(self, method_name, self.generic_visit)
         return visitor(node_value, in_main)
@@ -52,12 +250,20 @@ class CodeGenerator:
 
         if isinstance(expr_code, list):
             base_type = expr_type.replace("[]", "")
-            line = f"{base_type} {identifier}[] = {{{', '.join(expr_code)}}};\n"
-            self.variables[identifier] = base_type
+            # While streaming, later statements of main may still assign to a list declared in main
+            read_only = identifier not in self.assigned_names and (self.in_function_definition or not self.streaming)
+            if expr_code and read_only and all(self.is_constant_code(code) for code in expr_code):
+                # A list that is never written to is shared through a pooled static array
+                pool_name = self.pool_list(base_type, expr_code)
+                pointer_type = "const char* const*" if base_type == "const char*" else f"const {base_type}*"
+                line = f"{pointer_type} {identifier} = {pool_name};\n"
+            else:
+                line = f"{base_type} {identifier}[] = {{{', '.join(expr_code)}}};\n"
+            self.symbols.declare(identifier, base_type)
         else:
             c_type = self.map_type(expr_type)
             line = f"{c_type} {identifier} = {expr_code};\n"
-            self.variables[identifier] = c_type
+            self.symbols.declare(identifier, c_type)
 
         self.append_code(line, in_main)
 
@@ -104,6 +310,9 @@ class CodeGenerator:
             if "[]" in self.current_function_return_type:
                 raise Exception("Error: Returning arrays is not allowed.")
 
+        # Loops left early still account for the time spent in them
+        for region in reversed(self.profile_loops):
+            self.append_code(f"_prof_cycles[{region}] += _prof_now() - _prof_start{region};\n", in_main)
         line = f"return {expr_code};\n"
         self.append_code(line, in_main)
 
@@ -125,55 +334,86 @@ class CodeGenerator:
 
         dce_result = self.evaluate_if_condition(condition)
         if dce_result is True:
-            for stmt in then_block["Block"]:
-                self.visit(stmt, in_main)
+            self.visit_constant_branch(then_block["Block"], in_main)
         elif dce_result is False:
             if else_block is not None:
-                for stmt in else_block["Block"]:
-                    self.visit(stmt, in_main)
+                self.visit_constant_branch(else_block["Block"], in_main)
         else:
             cond_code, _ = self.generate_expression(condition)
             line = f"if ({cond_code}) {{\n"
             self.append_code(line, in_main)
             self.indent_level += 1
+            self.symbols.push_scope()
             for stmt in then_block["Block"]:
                 self.visit(stmt, in_main)
+            self.symbols.pop_scope()
             self.indent_level -= 1
             self.append_code("}\n", in_main)
 
             if else_block is not None:
                 self.append_code("else {\n", in_main)
                 self.indent_level += 1
+                self.symbols.push_scope()
                 for stmt in else_block["Block"]:
                     self.visit(stmt, in_main)
+                self.symbols.pop_scope()
                 self.indent_level -= 1
                 self.append_code("}\n", in_main)
 
+    def visit_constant_branch(self, statements, in_main):
+        # The taken branch of a constant condition is emitted without its if. A branch
+        # that declares variables keeps its braces, so its names do not clash with or
+        # shadow the enclosing block's.
+        scoped = any("VarDeclaration" in stmt for stmt in statements)
+        if scoped:
+            self.append_code("{\n", in_main)
+            self.indent_level += 1
+            self.symbols.push_scope()
+        for stmt in statements:
+            self.visit(stmt, in_main)
+        if scoped:
+            self.symbols.pop_scope()
+            self.indent_level -= 1
+            self.append_code("}\n", in_main)
+
     def visit_Loop(self, node, in_main):
         condition = node["Condition"]
         block = node["Block"]
 
         loop_result = self.evaluate_if_condition(condition)
 
+        if loop_result is False:
+            return
         if loop_result is True:
             line = "while (1) {\n"
-            self.append_code(line, in_main)
-            self.indent_level += 1
-            for stmt in block["Block"]:
-                self.visit(stmt, in_main)
-            self.indent_level -= 1
-            self.append_code("}\n", in_main)
-        elif loop_result is False:
-            pass
         else:
             cond_code, _ = self.generate_expression(condition)
             line = f"while ({cond_code}) {{\n"
-            self.append_code(line, in_main)
-            self.indent_level += 1
-            for stmt in block["Block"]:
-                self.visit(stmt, in_main)
-            self.indent_level -= 1
-            self.append_code("}\n", in_main)
+
+        region = None
+        if self.profile_source is not None:
+            region = self.add_profile_region("loop", node)
+            self.append_code(self.line_directive(node), in_main)
+            self.append_code(f"_prof_entries[{region}]++;\n", in_main)
+            self.append_code(f"unsigned long long _prof_start{region} = _prof_now();\n", in_main)
+            self.append_code(self.line_directive(node), in_main)
+            self.profile_loops.append(region)
+
+        self.append_code(line, in_main)
+        self.indent_level += 1
+        if region is not None:
+            self.append_code(f"_prof_iterations[{region}]++;\n", in_main)
+        self.symbols.push_scope()
+        for stmt in block["Block"]:
+            self.visit(stmt, in_main)
+        self.symbols.pop_scope()
+        self.indent_level -= 1
+        self.append_code("}\n", in_main)
+
+        if region is not None:
+            self.profile_loops.pop()
+            self.append_code(self.line_directive(node), in_main)
+            self.append_code(f"_prof_cycles[{region}] += _prof_now() - _prof_start{region};\n", in_main)
 
     def visit_FunctionDef(self, node, in_main):
         func_name = node["Name"]
@@ -182,15 +422,24 @@ class CodeGenerator:
 
         old_main_code = self.main_code
         old_indent = self.indent_level
-        old_variables = self.variables.copy()
         old_in_function = self.in_function_definition
         old_return_type = self.current_function_return_type
+        old_function_name = self.current_function_name
+        old_profile_loops = self.profile_loops
 
         self.main_code = ""
         self.indent_level = 1
-        self.variables = {}
+        # The function body sees only its own parameters and locals
+        self.symbols.push_frame()
+        for parameter in parameters:
+            self.symbols.declare(parameter, "int")
         self.in_function_definition = True
         self.current_function_return_type = None
+        self.current_function_name = func_name
+        self.profile_loops = []
+        region = None
+        if self.profile_source is not None:
+            region = self.add_profile_region("function", node)
         params_code = ", ".join([f"int {p}" for p in parameters])
 
         for stmt in body["Block"]:
@@ -203,22 +452,37 @@ class CodeGenerator:
 
         if "[]" in self.current_function_return_type:
             raise Exception(f"Error: Function '{func_name}' returns an array, which is not allowed.")
+        # Calls were typed by the signature prepass, which also sees returns in branches
+        # dropped here because their condition folded to a constant
+        if self.current_function_return_type != self.function_return_type.get(func_name, self.current_function_return_type):
+            raise Exception("Error: Multiple return types in function body are not consistent.")
 
         c_return_type = self.map_type(self.current_function_return_type)
-        func_code = f"{c_return_type} {func_name}({params_code}) {{\n"
-        func_code += self.main_code
-        func_code += "}\n\n"
+        if region is None:
+            func_code = f"{c_return_type} {func_name}({params_code}) {{\n"
+            func_code += self.main_code
+            func_code += "}\n\n"
+        else:
+            func_code = self.profiled_function(func_name, parameters, c_return_type, region, node)
 
         self.function_return_type[func_name] = self.current_function_return_type
+        self.function_prototypes += f"{c_return_type} {func_name}({params_code});\n"
 
         self.main_code = old_main_code
         self.indent_level = old_indent
-        self.variables = old_variables
+        self.symbols.pop_frame()
         self.in_function_definition = old_in_function
         self.current_function_return_type = old_return_type
+        self.current_function_name = old_function_name
+        self.profile_loops = old_profile_loops
 
         self.functions_code += func_code
 
+    def visit_Import(self, node, in_main):
+        # The imported functions' prototypes are emitted from the module's interface
+        if node not in self.imports:
+            raise Exception(f"Error: No interface for imported module '{node}'; multi-file programs are built with build.py.")
+
     def visit_EmptyStatement(self, node, in_main):
         self.append_code(";\n", in_main)
 
@@ -238,16 +502,17 @@ class CodeGenerator:
             string_val = node_value
             if string_val.startswith('"') and string_val.endswith('"'):
                 string_val = string_val[1:-1]
-            return (f"\"{string_val}\"", "string")
+            return (self.pool_string(f"\"{string_val}\""), "string")
         elif node_type == "Identifier":
             var_name = node_value
-            var_type = self.variables.get(var_name, "int")
+            var_type = self.symbols.lookup(var_name, "int")
             return (var_name, self.reverse_map_type(var_type))
         elif node_type == "IndexedIdentifier":
             ident = node_value["Identifier"]
             index_expr = node_value["Index"]
             index_code, _ = self.generate_expression(index_expr)
-            return (f"{ident}[{index_code}]", "int")
+            elem_type = self.symbols.lookup(ident, "int")
+            return (f"{ident}[{index_code}]", self.reverse_map_type(elem_type))
         elif node_type == "FunctionCall":
             func_name = node_value["Name"]
             args = node_value["Arguments"]
@@ -264,6 +529,9 @@ class CodeGenerator:
             left_code, left_type = self.generate_expression(left_node)
             right_code, right_type = self.generate_expression(right_node)
             result_type = self.pick_numeric_type(left_type, right_type)
+            simplified = self.simplify_algebra(left_node, left_code, left_type, right_node, right_code, right_type, op, result_type)
+            if simplified is not None:
+                return simplified
             return self.constant_fold(left_code, right_code, op, result_type)
         elif node_type == "ArithmeticExpression":
             left_node = node_value["Left"]
@@ -272,6 +540,9 @@ class CodeGenerator:
             left_code, left_type = self.generate_expression(left_node)
             right_code, right_type = self.generate_expression(right_node)
             result_type = self.pick_numeric_type(left_type, right_type)
+            simplified = self.simplify_algebra(left_node, left_code, left_type, right_node, right_code, right_type, op, result_type)
+            if simplified is not None:
+                return simplified
             return self.constant_fold(left_code, right_code, op, result_type)
         elif node_type == "RelationalExpression":
             left_node = node_value["Left"]
@@ -346,7 +617,7 @@ class CodeGenerator:
         elif expr_type == "float":
             return "double"
         elif expr_type == "string":
-            return "char*"
+            return "const char*"
         else:
             return "int"
 
@@ -355,7 +626,7 @@ class CodeGenerator:
             return "int"
         elif c_type == "double":
             return "float"
-        elif c_type == "char*":
+        elif c_type == "const char*":
             return "string"
         return "int"
 
@@ -364,6 +635,143 @@ class CodeGenerator:
             return "float"
         return "int"
 
+    def add_profile_region(self, kind, node):
+        self.profile_regions.append({"kind": kind, "name": self.current_function_name, "line": node.get("Line", 0)})
+        return len(self.profile_regions) - 1
+
+    def line_directive(self, node):
+        # Map the following C lines back to the LiteLang source. Every statement gets
+        # one; statements made up by an optimization without a line of their own are
+        # mapped to the line of the statement before them.
+        line = node.get("Line")
+        if line is None:
+            kind = list(node.keys())[0]
+            if isinstance(node[kind], dict):
+                line = node[kind].get("Line")
+        if line is None:
+            line = self.source_line
+        if line is None:
+            return ""
+        self.source_line = line
+        return f'#line {line} "{self.escape_c_string(self.profile_source)}"\n'
+
+    def escape_c_string(self, text):
+        return text.replace("\\", "\\\\").replace('"', '\\"')
+
+    def profiled_function(self, func_name, parameters, c_return_type, region, node):
+        # The body becomes a static helper and the public name a wrapper that counts
+        # calls and times only the outermost activation, so recursion is not double counted
+        params_code = ", ".join([f"int {p}" for p in parameters])
+        func_code = self.line_directive(node)
+        func_code += f"static {c_return_type} _prof_body_{func_name}({params_code}) {{\n"
+        func_code += self.main_code
+        func_code += "}\n\n"
+        func_code += self.line_directive(node)
+        func_code += f"{c_return_type} {func_name}({params_code}) {{\n"
+        func_code += "    static int _prof_depth = 0;\n"
+        func_code += "    static unsigned long long _prof_start;\n"
+        func_code += f"    {c_return_type} _prof_result;\n"
+        func_code += f"    _prof_entries[{region}]++;\n"
+        func_code += "    if (_prof_depth++ == 0) _prof_start = _prof_now();\n"
+        func_code += f"    _prof_result = _prof_body_{func_name}({', '.join(parameters)});\n"
+        func_code += f"    if (--_prof_depth == 0) _prof_cycles[{region}] += _prof_now() - _prof_start;\n"
+        func_code += "    return _prof_result;\n"
+        func_code += "}\n\n"
+        return func_code
+
+    def profile_runtime(self):
+        # Counters, a cycle timer and an exit handler writing the profile as JSON
+        count = len(self.profile_regions)
+        size = max(count, 1)
+        kinds = ", ".join(f'"{region["kind"]}"' for region in self.profile_regions) or "0"
+        names = ", ".join(f'"{region["name"]}"' for region in self.profile_regions) or "0"
+        lines = ", ".join(str(region["line"]) for region in self.profile_regions) or "0"
+        source = self.escape_c_string(self.escape_c_string(self.profile_source))
+        return rf"""#include <stdlib.h>
+#if defined(__x86_64__) || defined(__i386__)
+#include <x86intrin.h>
+#define _PROF_TIMER "rdtsc"
+static unsigned long long _prof_now(void) {{
+    return __rdtsc();
+}}
+#else
+#include <time.h>
+#define _PROF_TIMER "ns"
+static unsigned long long _prof_now(void) {{
+    struct timespec ts;
+    clock_gettime(CLOCK_MONOTONIC, &ts);
+    return (unsigned long long)ts.tv_sec * 1000000000ULL + ts.tv_nsec;
+}}
+#endif
+
+static const char* const _prof_kinds[{size}] = {{{kinds}}};
+static const char* const _prof_names[{size}] = {{{names}}};
+static const int _prof_lines[{size}] = {{{lines}}};
+static unsigned long long _prof_entries[{size}];
+static unsigned long long _prof_iterations[{size}];
+static unsigned long long _prof_cycles[{size}];
+static unsigned long long _prof_program_start;
+
+static void _prof_report(void) {{
+    const char* path = getenv("LITEL_PROFILE_OUT");
+    FILE* out = fopen(path ? path : "litel_profile.json", "w");
+    int i;
+    if (!out) return;
+    fprintf(out, "{{\n  \"source\": \"{source}\",\n  \"timer\": \"%s\",\n", _PROF_TIMER);
+    fprintf(out, "  \"total_cycles\": %llu,\n  \"regions\": [\n", _prof_now() - _prof_program_start);
+    for (i = 0; i < {count}; i++) {{
+        fprintf(out, "    {{\"kind\": \"%s\", \"name\": \"%s\", \"line\": %d, \"entries\": %llu, \"iterations\": %llu, \"cycles\": %llu}}%s\n",
+                _prof_kinds[i], _prof_names[i], _prof_lines[i], _prof_entries[i], _prof_iterations[i], _prof_cycles[i], i + 1 < {count} ? "," : "");
+    }}
+    fprintf(out, "  ]\n}}\n");
+    fclose(out);
+}}
+
+"""
+
+    def pool_string(self, literal):
+        # Identical string literals share one static constant
+        if literal not in self.string_pool:
+            name = f"_str{len(self.string_pool)}"
+            self.string_pool[literal] = name
+            self.string_names.add(name)
+            self.pool_code += f"static const char {name}[] = {literal};\n"
+            self.pool_entries.append((name, "string", literal))
+        return self.string_pool[literal]
+
+    def pool_list(self, c_type, elements):
+        # Identical read-only lists share one static constant array of recorded length
+        key = (c_type, tuple(elements))
+        if key not in self.list_pool:
+            name = f"_list{len(self.list_pool)}"
+            self.list_pool[key] = (name, len(elements))
+            if c_type == "const char*":
+                declaration = f"static const char* const {name}[{len(elements)}]"
+            else:
+                declaration = f"static const {c_type} {name}[{len(elements)}]"
+            self.pool_code += f"{declaration} = {{{', '.join(elements)}}};\n"
+            self.pool_entries.append((name, "list", (c_type, list(elements))))
+        return self.list_pool[key][0]
+
+    def is_constant_code(self, code):
+        return self.is_numeric_literal(code) or code in self.string_names
+
+    def collect_assigned_names(self, node, names):
+        # Names that are assigned to anywhere in the program, whole or by element
+        if isinstance(node, dict):
+            for key, value in node.items():
+                if key == "Assignment":
+                    assignable = value["Assignable"]
+                    if "IndexedIdentifier" in assignable:
+                        names.add(assignable["IndexedIdentifier"]["Identifier"])
+                    else:
+                        names.add(assignable["Identifier"])
+                self.collect_assigned_names(value, names)
+        elif isinstance(node, list):
+            for item in node:
+                self.collect_assigned_names(item, names)
+        return names
+
     def append_code(self, line, in_main):
         if self.in_function_definition:
             self.main_code += self.indent() + line
@@ -384,7 +792,13 @@ class CodeGenerator:
             elif op == '/':
                 if right_val == 0:
                     return (f"({left_code} {op} {right_code})", result_type)
-                val = left_val / right_val if result_type == "float" else left_val // right_val
+                if result_type == "float":
+                    val = left_val / right_val
+                else:
+                    # C integer division truncates toward zero
+                    val = abs(left_val) // abs(right_val)
+                    if (left_val < 0) != (right_val < 0):
+                        val = -val
             else:
                 return (f"({left_code} {op} {right_code})", result_type)
 
@@ -394,14 +808,113 @@ class CodeGenerator:
         else:
             return (f"({left_code} {op} {right_code})", result_type)
 
+    def simplify_algebra(self, left_node, left_code, left_type, right_node, right_code, right_type, op, result_type):
+        # Apply algebraic identities and strength reductions when exactly one side is a literal.
+        # An operand is only returned unchanged if its type already matches the result type.
+        if left_type not in ("int", "float") or right_type not in ("int", "float"):
+            return None
+        left_literal = self.is_numeric_literal(left_code)
+        right_literal = self.is_numeric_literal(right_code)
+        if left_literal == right_literal:
+            return None
+        left_val = float(left_code) if left_literal else None
+        right_val = float(right_code) if right_literal else None
+
+        if op == '+':
+            if right_val == 0 and left_type == result_type:
+                return (left_code, left_type)
+            if left_val == 0 and right_type == result_type:
+                return (right_code, right_type)
+        elif op == '-':
+            if right_val == 0 and left_type == result_type:
+                return (left_code, left_type)
+            if left_val == 0 and right_type == result_type:
+                return (f"(-{right_code})", right_type)
+        elif op == '*':
+            if right_val == 1 and left_type == result_type:
+                return (left_code, left_type)
+            if left_val == 1 and right_type == result_type:
+                return (right_code, right_type)
+            # Multiplying by zero drops the other operand, so it must have no side effects.
+            # Floats are left alone: NaN and infinity times zero is not zero.
+            # Multiplication by a power of two stays a multiplication; left-shifting a
+            # negative int is undefined in C, and gcc emits the shift itself when it is safe.
+            if result_type == "int" and (right_val == 0 and is_pure(left_node) or left_val == 0 and is_pure(right_node)):
+                return ("0", "int")
+        elif op == '/':
+            if right_val == 1 and left_type == result_type:
+                return (left_code, left_type)
+            shift = self.power_of_two(right_val)
+            if result_type == "int" and shift and "Identifier" in left_node:
+                # C division truncates toward zero, so negative dividends are biased before shifting
+                mask = (1 << shift) - 1
+                return (f"(({left_code} < 0 ? {left_code} + {mask} : {left_code}) >> {shift})", "int")
+        return None
+
+    def power_of_two(self, value):
+        # Return k if value is 2**k for some k >= 1, otherwise None
+        if value is None or value != int(value) or value < 2:
+            return None
+        value = int(value)
+        if value & (value - 1):
+            return None
+        return value.bit_length() - 1
+
     def is_numeric_literal(self, code_str):
         clean = code_str.strip("()")
         if clean.startswith('-'):
             clean = clean[1:]
         return clean.replace('.', '', 1).isdigit()
 
+
+def optimize_functions(functions, pure_functions):
+    # Runs in a worker process: the per-function part of the optimizer passes, in the
+    # order generate_code runs them. Temporaries are numbered from zero in each function.
+    results = []
+    for stmt in functions:
+        eliminator = DeadCodeEliminator()
+        licm = LoopInvariantCodeMotion()
+        licm.pure_functions = pure_functions
+        cse = CommonSubexpressionEliminator()
+        stmt = eliminator.drop_dead_variables_in_function(stmt)
+        stmt = cse.optimize_block(licm.optimize_block([stmt], "main"), "main")[0]
+        results.append((stmt, eliminator.removed, (licm.hoisted, licm.temp_count), (cse.hoisted, cse.temp_count)))
+    return results
+
+
+def generate_functions(functions, function_return_type, assigned_names):
+    # Runs in a worker process: generate each top-level function, and the functions
+    # nested in it, with a generator of its own
+    results = []
+    for stmt in functions:
+        generator = CodeGenerator({"Program": []})
+        generator.function_return_type = dict(function_return_type)
+        generator.assigned_names = assigned_names
+        generator.visit(stmt, in_main=True)
+        return_types = {name: return_type for name, return_type in generator.function_return_type.items()
+                        if function_return_type.get(name) != return_type}
+        results.append((generator.functions_code, generator.function_prototypes, generator.pool_entries, return_types))
+    return results
+
+
 if __name__ == "__main__":
+    profile_source = None
+    jobs = None
+    args = sys.argv[1:]
+    # --jobs N optimizes and generates the functions of programs with many of them in N processes
+    if len(args) >= 2 and args[0] == "--jobs":
+        jobs = int(args[1])
+        args = args[2:]
+    if len(args) == 2 and args[0] == "--profile":
+        profile_source = args[1]
+    elif len(args) != 0:
+        print("Usage: python3 code_generator.py [--jobs N] [--profile <source_file.litel>] < ast.json", file=sys.stderr)
+        sys.exit(1)
     ast = json.load(sys.stdin)
-    generator = CodeGenerator(ast)
+    generator = CodeGenerator(ast, profile_source, jobs=jobs)
     c_code = generator.generate_code()
+    for entry in generator.removed_code:
+        print(f"Dead code eliminated: {entry}", file=sys.stderr)
+    for entry in generator.hoisted_code:
+        print(f"Hoisted {entry}", file=sys.stderr)
     print(c_code)
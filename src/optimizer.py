@@ -0,0 +1,860 @@
+import re
+import sys
+import json
+
+
+def node_type(node):
+    return list(node.keys())[0]
+
+
+def is_pure(expr, pure_functions=frozenset()):
+    # An expression is pure if evaluating it has no side effects,
+    # i.e. it calls no function other than the given pure ones
+    if isinstance(expr, dict):
+        if "FunctionCall" in expr and expr["FunctionCall"]["Name"] not in pure_functions:
+            return False
+        return all(is_pure(value, pure_functions) for value in expr.values())
+    if isinstance(expr, list):
+        return all(is_pure(item, pure_functions) for item in expr)
+    return True
+
+
+def collect_calls(node, calls):
+    # Collect the names of all functions called in a subtree,
+    # without descending into nested function definitions
+    if isinstance(node, dict):
+        for key, value in node.items():
+            if key == "FunctionDef":
+                continue
+            if key in ("FunctionCall", "FunctionCallStatement"):
+                calls.add(value["Name"])
+            collect_calls(value, calls)
+    elif isinstance(node, list):
+        for item in node:
+            collect_calls(item, calls)
+    return calls
+
+
+def collect_reads(node, reads):
+    # Collect the names of all variables read in a subtree,
+    # without descending into nested function definitions
+    if isinstance(node, dict):
+        for key, value in node.items():
+            if key == "FunctionDef":
+                continue
+            if key == "Identifier" and isinstance(value, str):
+                reads.add(value)
+            elif key == "Assignable":
+                # The assigned variable itself is written, not read;
+                # only the index expression of an indexed target is read
+                if "IndexedIdentifier" in value:
+                    collect_reads(value["IndexedIdentifier"]["Index"], reads)
+                continue
+            elif key == "VarDeclaration":
+                collect_reads(value["Expression"], reads)
+                continue
+            collect_reads(value, reads)
+    elif isinstance(node, list):
+        for item in node:
+            collect_reads(item, reads)
+    return reads
+
+
+def constant_value(expr):
+    # Evaluate an expression built only from numeric literals, following C semantics.
+    # Returns None if the expression is not a compile-time constant.
+    kind = node_type(expr)
+    value = expr[kind]
+    if kind in ("IntegerLiteral", "FloatLiteral"):
+        return value
+    elif kind == "UnaryExpression":
+        operand = constant_value(value["Operand"])
+        if operand is None or value["Operator"] != "-":
+            return None
+        return -operand
+    elif kind in ("Term", "ArithmeticExpression", "RelationalExpression"):
+        left = constant_value(value["Left"])
+        right = constant_value(value["Right"])
+        if left is None or right is None:
+            return None
+        op = value["Operator"]
+        if op == "+":
+            return left + right
+        elif op == "-":
+            return left - right
+        elif op == "*":
+            return left * right
+        elif op == "/":
+            if right == 0:
+                return None
+            if isinstance(left, int) and isinstance(right, int):
+                quotient = abs(left) // abs(right)
+                return quotient if (left < 0) == (right < 0) else -quotient
+            return left / right
+        elif op == "<":
+            return int(left < right)
+        elif op == ">":
+            return int(left > right)
+        elif op == "<=":
+            return int(left <= right)
+        elif op == ">=":
+            return int(left >= right)
+        elif op == "==":
+            return int(left == right)
+        elif op == "!=":
+            return int(left != right)
+    return None
+
+
+def assigned_name(assignable):
+    if "IndexedIdentifier" in assignable:
+        return assignable["IndexedIdentifier"]["Identifier"]
+    return assignable["Identifier"]
+
+
+def collect_assignments(statements, writes):
+    # Collect the names of all variables declared or assigned in a statement list,
+    # including nested blocks but not nested function definitions
+    for stmt in statements:
+        kind = node_type(stmt)
+        value = stmt[kind]
+        if kind == "VarDeclaration":
+            writes.add(value["Identifier"])
+        elif kind == "Assignment":
+            writes.add(assigned_name(value["Assignable"]))
+        elif kind == "IfStatement":
+            collect_assignments(value["Then"]["Block"], writes)
+            if value["Else"] is not None:
+                collect_assignments(value["Else"]["Block"], writes)
+        elif kind == "Loop":
+            collect_assignments(value["Block"]["Block"], writes)
+    return writes
+
+
+def declares_variables(statements):
+    # Whether a statement list declares variables in its own scope
+    return any(node_type(stmt) == "VarDeclaration" for stmt in statements)
+
+
+def contains_return(statements):
+    for stmt in statements:
+        kind = node_type(stmt)
+        value = stmt[kind]
+        if kind == "Return":
+            return True
+        elif kind == "IfStatement":
+            if contains_return(value["Then"]["Block"]):
+                return True
+            if value["Else"] is not None and contains_return(value["Else"]["Block"]):
+                return True
+        elif kind == "Loop" and contains_return(value["Block"]["Block"]):
+            return True
+    return False
+
+
+def rebuild_blocks(stmt, transform):
+    # Return a copy of a statement with transform applied to each nested statement list
+    kind = node_type(stmt)
+    value = stmt[kind]
+    if kind == "IfStatement":
+        else_block = None
+        if value["Else"] is not None:
+            else_block = {"Block": transform(value["Else"]["Block"])}
+        return {"IfStatement": dict(value, Then={"Block": transform(value["Then"]["Block"])}, Else=else_block)}
+    elif kind == "Loop":
+        return {"Loop": dict(value, Block={"Block": transform(value["Block"]["Block"])})}
+    elif kind == "FunctionDef":
+        return {"FunctionDef": dict(value, Body={"Block": transform(value["Body"]["Block"])})}
+    return stmt
+
+
+def evaluated_expressions(stmt):
+    # The expressions a statement evaluates exactly once, before any of its writes
+    # happen; loop conditions are excluded because they are re-evaluated per iteration
+    kind = node_type(stmt)
+    value = stmt[kind]
+    if kind == "VarDeclaration":
+        return [value["Expression"]]
+    elif kind == "Assignment":
+        expressions = [value["Expression"]]
+        if "IndexedIdentifier" in value["Assignable"]:
+            expressions.append(value["Assignable"]["IndexedIdentifier"]["Index"])
+        return expressions
+    elif kind in ("Output", "Return"):
+        return [value]
+    elif kind == "FunctionCallStatement":
+        return list(value["Arguments"])
+    elif kind == "IfStatement":
+        return [value["Condition"]]
+    return []
+
+
+def own_expressions(stmt):
+    # The expressions a statement evaluates itself, leaving out those of its nested blocks
+    if node_type(stmt) == "Loop":
+        return [stmt["Loop"]["Condition"]]
+    return evaluated_expressions(stmt)
+
+
+def replace_expression(expr, target, replacement):
+    # Return a copy of expr with every subtree equal to target replaced
+    if isinstance(expr, dict):
+        if expr == target:
+            return replacement
+        return {k: replace_expression(v, target, replacement) for k, v in expr.items()}
+    if isinstance(expr, list):
+        return [replace_expression(item, target, replacement) for item in expr]
+    return expr
+
+
+def replace_in_statement(stmt, target, replacement):
+    # Replace a subexpression in the expressions a statement evaluates once,
+    # leaving nested blocks and loop conditions untouched
+    kind = node_type(stmt)
+    value = stmt[kind]
+    if kind == "VarDeclaration":
+        return {"VarDeclaration": dict(value, Expression=replace_expression(value["Expression"], target, replacement))}
+    elif kind == "Assignment":
+        assignable = value["Assignable"]
+        if "IndexedIdentifier" in assignable:
+            indexed = assignable["IndexedIdentifier"]
+            assignable = {"IndexedIdentifier": {"Identifier": indexed["Identifier"], "Index": replace_expression(indexed["Index"], target, replacement)}}
+        return {"Assignment": dict(value, Assignable=assignable, Expression=replace_expression(value["Expression"], target, replacement))}
+    elif kind in ("Output", "Return"):
+        return dict(stmt, **{kind: replace_expression(value, target, replacement)})
+    elif kind == "FunctionCallStatement":
+        return {"FunctionCallStatement": dict(value, Arguments=replace_expression(value["Arguments"], target, replacement))}
+    elif kind == "IfStatement":
+        return {"IfStatement": dict(value, Condition=replace_expression(value["Condition"], target, replacement))}
+    return stmt
+
+
+def source_line(stmt):
+    # The source line the parser recorded for a statement, as {"Line": n}, so that
+    # statements made up by an optimization can be mapped to the code they came from
+    kind = node_type(stmt)
+    value = stmt[kind]
+    if "Line" in stmt:
+        return {"Line": stmt["Line"]}
+    if isinstance(value, dict) and "Line" in value:
+        return {"Line": value["Line"]}
+    return {}
+
+
+def expression_key(expr):
+    return json.dumps(expr, sort_keys=True)
+
+
+def renumber_temporaries(node, prefix, offset):
+    # Return a copy of node with the temporaries named prefix0, prefix1, ... renumbered
+    # from offset on, for code optimized by an instance whose numbering started at zero
+    if isinstance(node, dict):
+        renumbered = {}
+        for key, value in node.items():
+            if key == "Identifier" and isinstance(value, str) and value.startswith(prefix) and value[len(prefix):].isdigit():
+                renumbered[key] = f"{prefix}{int(value[len(prefix):]) + offset}"
+            else:
+                renumbered[key] = renumber_temporaries(value, prefix, offset)
+        return renumbered
+    elif isinstance(node, list):
+        return [renumber_temporaries(item, prefix, offset) for item in node]
+    return node
+
+
+def renumber_report(entry, prefix, offset):
+    return re.sub(rf"\b{prefix}(\d+)\b", lambda match: f"{prefix}{int(match.group(1)) + offset}", entry)
+
+
+class DeadCodeEliminator:
+    def __init__(self, exported=frozenset()):
+        self.removed = []
+        self.functions = {}
+        # Functions other modules may call, which are live even if nothing here calls them
+        self.exported = exported
+
+    def eliminate(self, ast):
+        statements = self.prune(ast)["Program"]
+
+        # Pass 3: liveness, drop pure declarations of variables that are never read
+        statements = self.drop_dead_variables(statements, "main")
+
+        return {"Program": statements}
+
+    def prune(self, ast):
+        if "Program" not in ast:
+            raise Exception("AST does not have a Program node.")
+        self.removed = []
+        self.functions = {}
+
+        # Pass 1: control flow, drop unreachable statements and constant branches
+        statements = self.prune_block(ast["Program"], "main")
+
+        # Pass 2: tree shaking, drop functions unreachable from the top-level program
+        self.collect_functions(statements)
+        live_functions = self.live_functions(statements)
+        statements = self.drop_dead_functions(statements, live_functions)
+
+        return {"Program": statements}
+
+    # Reachability
+
+    def prune_block(self, statements, scope):
+        pruned = []
+        for index, stmt in enumerate(statements):
+            kind = node_type(stmt)
+            value = stmt[kind]
+            if kind == "IfStatement":
+                condition = constant_value(value["Condition"])
+                if condition is not None:
+                    # Only the taken branch survives, spliced into the enclosing block
+                    # unless it declares variables, which must not leak out of its scope
+                    taken = value["Then"] if condition else value["Else"]
+                    skipped = value["Else"] if condition else value["Then"]
+                    self.removed.append(f"constant condition: {'else' if condition else 'then'} branch in {scope}")
+                    if skipped is not None:
+                        pruned.extend(self.hoisted_functions(skipped["Block"], scope))
+                    taken_statements = self.prune_block(taken["Block"], scope) if taken is not None else []
+                    if declares_variables(taken_statements):
+                        # The code generator emits the taken branch of a constant condition as a nested block
+                        branches = ({"Then": {"Block": taken_statements}, "Else": None} if condition
+                                    else {"Then": {"Block": []}, "Else": {"Block": taken_statements}})
+                        pruned.append({"IfStatement": dict(value, **branches)})
+                    else:
+                        pruned.extend(taken_statements)
+                    if taken_statements and self.terminates(taken_statements):
+                        pruned.extend(self.drop_unreachable(statements[index + 1:], scope))
+                        break
+                    continue
+                then_block = {"Block": self.prune_block(value["Then"]["Block"], scope)}
+                else_block = None
+                if value["Else"] is not None:
+                    else_block = {"Block": self.prune_block(value["Else"]["Block"], scope)}
+                stmt = {"IfStatement": dict(value, Then=then_block, Else=else_block)}
+            elif kind == "Loop":
+                condition = constant_value(value["Condition"])
+                if condition is not None and not condition:
+                    self.removed.append(f"loop that never runs in {scope}")
+                    pruned.extend(self.hoisted_functions(value["Block"]["Block"], scope))
+                    continue
+                stmt = {"Loop": dict(value, Block={"Block": self.prune_block(value["Block"]["Block"], scope)})}
+            elif kind == "FunctionDef":
+                body = self.prune_block(value["Body"]["Block"], f"function '{value['Name']}'")
+                stmt = {"FunctionDef": dict(value, Body={"Block": body})}
+
+            pruned.append(stmt)
+            if self.terminates([stmt]):
+                pruned.extend(self.drop_unreachable(statements[index + 1:], scope))
+                break
+        return pruned
+
+    def terminates(self, statements):
+        # A statement list terminates if its last statement always returns
+        last = statements[-1]
+        kind = node_type(last)
+        if kind == "Return":
+            return True
+        if kind == "IfStatement":
+            value = last[kind]
+            return (value["Else"] is not None
+                    and bool(value["Then"]["Block"]) and self.terminates(value["Then"]["Block"])
+                    and bool(value["Else"]["Block"]) and self.terminates(value["Else"]["Block"]))
+        return False
+
+    def drop_unreachable(self, statements, scope):
+        for stmt in statements:
+            if node_type(stmt) != "FunctionDef":
+                self.removed.append(f"unreachable {node_type(stmt)} after return in {scope}")
+        return self.hoisted_functions(statements, scope)
+
+    def hoisted_functions(self, statements, scope):
+        # Function definitions are emitted at file scope, so the ones inside
+        # removed code stay callable; tree shaking decides whether they are kept
+        hoisted = []
+        for stmt in statements:
+            kind = node_type(stmt)
+            value = stmt[kind]
+            if kind == "FunctionDef":
+                hoisted.extend(self.prune_block([stmt], scope))
+            elif kind == "IfStatement":
+                hoisted.extend(self.hoisted_functions(value["Then"]["Block"], scope))
+                if value["Else"] is not None:
+                    hoisted.extend(self.hoisted_functions(value["Else"]["Block"], scope))
+            elif kind == "Loop":
+                hoisted.extend(self.hoisted_functions(value["Block"]["Block"], scope))
+        return hoisted
+
+    # Tree shaking
+
+    def collect_functions(self, statements):
+        for stmt in self.walk_statements(statements):
+            if node_type(stmt) == "FunctionDef":
+                self.functions[stmt["FunctionDef"]["Name"]] = stmt["FunctionDef"]
+
+    def walk_statements(self, statements):
+        for stmt in statements:
+            yield stmt
+            kind = node_type(stmt)
+            value = stmt[kind]
+            if kind == "IfStatement":
+                yield from self.walk_statements(value["Then"]["Block"])
+                if value["Else"] is not None:
+                    yield from self.walk_statements(value["Else"]["Block"])
+            elif kind == "Loop":
+                yield from self.walk_statements(value["Block"]["Block"])
+            elif kind == "FunctionDef":
+                yield from self.walk_statements(value["Body"]["Block"])
+
+    def live_functions(self, statements):
+        worklist = list(collect_calls(statements, set())) + list(self.exported)
+        live = set()
+        while worklist:
+            name = worklist.pop()
+            if name in live or name not in self.functions:
+                continue
+            live.add(name)
+            worklist.extend(collect_calls(self.functions[name]["Body"], set()))
+        return live
+
+    def drop_dead_functions(self, statements, live_functions):
+        kept = []
+        for stmt in statements:
+            kind = node_type(stmt)
+            value = stmt[kind]
+            if kind == "FunctionDef":
+                if value["Name"] not in live_functions:
+                    self.removed.append(f"unused function '{value['Name']}'")
+                    continue
+                body = self.drop_dead_functions(value["Body"]["Block"], live_functions)
+                stmt = {"FunctionDef": dict(value, Body={"Block": body})}
+            elif kind == "IfStatement":
+                then_block = {"Block": self.drop_dead_functions(value["Then"]["Block"], live_functions)}
+                else_block = None
+                if value["Else"] is not None:
+                    else_block = {"Block": self.drop_dead_functions(value["Else"]["Block"], live_functions)}
+                stmt = {"IfStatement": dict(value, Then=then_block, Else=else_block)}
+            elif kind == "Loop":
+                block = {"Block": self.drop_dead_functions(value["Block"]["Block"], live_functions)}
+                stmt = {"Loop": dict(value, Block=block)}
+            kept.append(stmt)
+        return kept
+
+    # Liveness
+
+    def drop_dead_variables(self, statements, scope, functions=None):
+        # Each C function body (main included) is its own scope; nested
+        # function definitions are processed with their own scope. If given,
+        # functions yields (function, removed) for each function in statements
+        # that another eliminator already processed, in order.
+        if functions is None:
+            statements = [self.drop_dead_variables_in_function(stmt) for stmt in statements]
+        else:
+            statements = [self.adopt(*next(functions)) if node_type(stmt) == "FunctionDef"
+                          else self.drop_dead_variables_in_function(stmt) for stmt in statements]
+        writes = {}
+        self.collect_writes(statements, writes)
+        # How many statements read each variable, and the variables read by the
+        # statements that write each variable
+        read_counts = {}
+        reads_of_writes = {}
+        for stmt in self.walk_statements_in_scope(statements):
+            reads = collect_reads(own_expressions(stmt), set())
+            for name in reads:
+                read_counts[name] = read_counts.get(name, 0) + 1
+            kind = node_type(stmt)
+            if kind == "VarDeclaration":
+                reads_of_writes.setdefault(stmt[kind]["Identifier"], []).append(reads)
+            elif kind == "Assignment":
+                reads_of_writes.setdefault(assigned_name(stmt[kind]["Assignable"]), []).append(reads)
+
+        # Removing the writes of a dead variable may leave the variables they read
+        # unread, which are then removed in the next round
+        dead = set()
+        candidates = [name for name, pure in writes.items() if pure and not read_counts.get(name)]
+        while candidates:
+            found = sorted(set(candidates) - dead)
+            candidates = []
+            for name in found:
+                self.removed.append(f"unused variable '{name}' in {scope}")
+                dead.add(name)
+            for name in found:
+                for reads in reads_of_writes.get(name, []):
+                    for read in reads:
+                        read_counts[read] -= 1
+                        if not read_counts[read] and writes.get(read) and read not in dead:
+                            candidates.append(read)
+        return self.remove_writes(statements, dead) if dead else statements
+
+    def adopt(self, function, removed):
+        self.removed.extend(removed)
+        return function
+
+    def drop_dead_variables_in_function(self, stmt):
+        kind = node_type(stmt)
+        value = stmt[kind]
+        if kind == "FunctionDef":
+            body = self.drop_dead_variables(value["Body"]["Block"], f"function '{value['Name']}'")
+            return {"FunctionDef": dict(value, Body={"Block": body})}
+        elif kind == "IfStatement":
+            then_block = {"Block": [self.drop_dead_variables_in_function(s) for s in value["Then"]["Block"]]}
+            else_block = None
+            if value["Else"] is not None:
+                else_block = {"Block": [self.drop_dead_variables_in_function(s) for s in value["Else"]["Block"]]}
+            return {"IfStatement": dict(value, Then=then_block, Else=else_block)}
+        elif kind == "Loop":
+            block = {"Block": [self.drop_dead_variables_in_function(s) for s in value["Block"]["Block"]]}
+            return {"Loop": dict(value, Block=block)}
+        return stmt
+
+    def collect_writes(self, statements, writes):
+        # Map every variable declared with 'make' in this scope to whether
+        # all of its declarations and assignments are free of side effects
+        assigned = {}
+        for stmt in self.walk_statements_in_scope(statements):
+            kind = node_type(stmt)
+            value = stmt[kind]
+            if kind == "VarDeclaration":
+                name = value["Identifier"]
+                writes[name] = writes.get(name, True) and is_pure(value["Expression"])
+            elif kind == "Assignment":
+                target = value["Assignable"]
+                pure = is_pure(value["Expression"])
+                if "IndexedIdentifier" in target:
+                    name = target["IndexedIdentifier"]["Identifier"]
+                    pure = pure and is_pure(target["IndexedIdentifier"]["Index"])
+                else:
+                    name = target["Identifier"]
+                assigned[name] = assigned.get(name, True) and pure
+        for name, pure in assigned.items():
+            if name in writes:
+                writes[name] = writes[name] and pure
+
+    def walk_statements_in_scope(self, statements):
+        for stmt in statements:
+            kind = node_type(stmt)
+            value = stmt[kind]
+            if kind == "FunctionDef":
+                continue
+            yield stmt
+            if kind == "IfStatement":
+                yield from self.walk_statements_in_scope(value["Then"]["Block"])
+                if value["Else"] is not None:
+                    yield from self.walk_statements_in_scope(value["Else"]["Block"])
+            elif kind == "Loop":
+                yield from self.walk_statements_in_scope(value["Block"]["Block"])
+
+    def remove_writes(self, statements, dead):
+        kept = []
+        for stmt in statements:
+            kind = node_type(stmt)
+            value = stmt[kind]
+            if kind == "VarDeclaration" and value["Identifier"] in dead:
+                continue
+            elif kind == "Assignment":
+                target = value["Assignable"]
+                name = target["IndexedIdentifier"]["Identifier"] if "IndexedIdentifier" in target else target["Identifier"]
+                if name in dead:
+                    continue
+            elif kind == "IfStatement":
+                then_block = {"Block": self.remove_writes(value["Then"]["Block"], dead)}
+                else_block = None
+                if value["Else"] is not None:
+                    else_block = {"Block": self.remove_writes(value["Else"]["Block"], dead)}
+                stmt = {"IfStatement": dict(value, Then=then_block, Else=else_block)}
+            elif kind == "Loop":
+                block = {"Block": self.remove_writes(value["Block"]["Block"], dead)}
+                stmt = {"Loop": dict(value, Block=block)}
+            kept.append(stmt)
+        return kept
+
+
+class CommonSubexpressionEliminator:
+    # Expressions worth keeping in a temporary; identifiers and literals are already cheap
+    CANDIDATES = ("Term", "ArithmeticExpression", "RelationalExpression", "UnaryExpression", "IndexedIdentifier")
+
+    def __init__(self):
+        self.hoisted = []
+        self.temp_count = 0
+        # Subexpressions seen so far in the block being scanned
+        self.seen = 0
+
+    def eliminate(self, ast):
+        if "Program" not in ast:
+            raise Exception("AST does not have a Program node.")
+        self.hoisted = []
+        return {"Program": self.optimize_block(ast["Program"], "main")}
+
+    def optimize_block(self, statements, scope, functions=None):
+        # Every nested block is a basic block of its own. If given, functions yields
+        # (hoisted, temp_count) for each function in statements that another
+        # instance already optimized, in order.
+        optimized = []
+        for stmt in statements:
+            if functions is not None and node_type(stmt) == "FunctionDef":
+                optimized.append(self.adopt(stmt, *next(functions)))
+            elif node_type(stmt) == "FunctionDef":
+                name = stmt["FunctionDef"]["Name"]
+                optimized.append(rebuild_blocks(stmt, lambda block: self.optimize_block(block, f"function '{name}'")))
+            else:
+                optimized.append(rebuild_blocks(stmt, lambda block: self.optimize_block(block, scope)))
+        statements = optimized
+
+        while True:
+            repeated = self.find_repeated(statements)
+            if not repeated:
+                return statements
+            statements = self.hoist(statements, repeated, scope)
+
+    def adopt(self, function, hoisted, temp_count):
+        # The other instance numbered its temporaries from zero
+        self.hoisted.extend(renumber_report(entry, "_cse", self.temp_count) for entry in hoisted)
+        function = renumber_temporaries(function, "_cse", self.temp_count) if temp_count else function
+        self.temp_count += temp_count
+        return function
+
+    def find_repeated(self, statements):
+        # Scan the block in order, tracking for each pure subexpression how many times
+        # it is evaluated before one of the variables it reads is written again.
+        # Returns (key, expression, first, last) for every subexpression seen twice.
+        active = {}
+        self.seen = 0
+        # Variable name -> keys of the active subexpressions that read it
+        readers = {}
+        repeated = []
+        for index, stmt in enumerate(statements):
+            if node_type(stmt) == "FunctionDef":
+                continue
+            for expr in evaluated_expressions(stmt):
+                self.count_subexpressions(expr, index, active, readers)
+            # Function calls cannot reach the caller's locals, so only the
+            # statement's own writes (and those of its nested blocks) kill
+            killed = set()
+            for name in collect_assignments([stmt], set()):
+                killed.update(readers.pop(name, ()))
+            # Retired in the order they were first seen, as the block is scanned
+            for key in sorted(killed, key=lambda key: active[key]["order"]):
+                entry = active.pop(key)
+                for name in entry["reads"]:
+                    if name in readers:
+                        readers[name].discard(key)
+                self.retire(key, entry, repeated)
+        for key, entry in active.items():
+            self.retire(key, entry, repeated)
+
+        # Hoist only the largest repeated expressions this round; anything nested
+        # inside one of them is reconsidered once the outer one is in a temporary
+        keys = [entry[0] for entry in repeated]
+        return [entry for entry in repeated if not any(entry[0] != other and entry[0] in other for other in keys)]
+
+    def count_subexpressions(self, expr, index, active, readers):
+        if isinstance(expr, list):
+            for item in expr:
+                self.count_subexpressions(item, index, active, readers)
+            return
+        if not isinstance(expr, dict):
+            return
+        kind = node_type(expr)
+        if kind in self.CANDIDATES and is_pure(expr) and constant_value(expr) is None:
+            key = expression_key(expr)
+            if key in active:
+                active[key]["count"] += 1
+                active[key]["last"] = index
+            else:
+                reads = collect_reads(expr, set())
+                active[key] = {"expr": expr, "count": 1, "first": index, "last": index, "reads": reads, "order": self.seen}
+                self.seen += 1
+                for name in reads:
+                    readers.setdefault(name, set()).add(key)
+        for value in expr[kind].values() if isinstance(expr[kind], dict) else [expr[kind]]:
+            self.count_subexpressions(value, index, active, readers)
+
+    def retire(self, key, entry, repeated):
+        if entry["count"] > 1:
+            repeated.append((key, entry["expr"], entry["first"], entry["last"]))
+
+    def hoist(self, statements, repeated, scope):
+        declarations = {}
+        statements = list(statements)
+        for key, expr, first, last in repeated:
+            temp = f"_cse{self.temp_count}"
+            self.temp_count += 1
+            self.hoisted.append(f"common subexpression into {temp} in {scope}")
+            declarations.setdefault(first, []).append(
+                {"VarDeclaration": {"Identifier": temp, "Expression": expr, **source_line(statements[first])}})
+            for index in range(first, last + 1):
+                statements[index] = replace_in_statement(statements[index], expr, {"Identifier": temp})
+
+        hoisted = []
+        for index, stmt in enumerate(statements):
+            hoisted.extend(declarations.get(index, []))
+            hoisted.append(stmt)
+        return hoisted
+
+
+class LoopInvariantCodeMotion:
+    CANDIDATES = CommonSubexpressionEliminator.CANDIDATES + ("FunctionCall",)
+
+    def __init__(self):
+        self.hoisted = []
+        self.temp_count = 0
+        self.pure_functions = set()
+
+    def optimize(self, ast):
+        if "Program" not in ast:
+            raise Exception("AST does not have a Program node.")
+        self.hoisted = []
+        self.pure_functions = self.find_pure_functions(ast["Program"])
+        return {"Program": self.optimize_block(ast["Program"], "main")}
+
+    def find_pure_functions(self, statements):
+        # A function is pure if it prints nothing and only calls pure functions.
+        # Start by assuming every function is pure and remove the ones that
+        # are not until nothing changes, so recursive functions can stay pure.
+        functions = {}
+        pending = list(statements)
+        while pending:
+            stmt = pending.pop()
+            kind = node_type(stmt)
+            if kind == "FunctionDef":
+                functions[stmt[kind]["Name"]] = stmt[kind]
+            pending.extend(nested for block in self.nested_blocks(stmt) for nested in block)
+
+        pure = {name for name, func in functions.items() if not self.prints(func["Body"]["Block"])}
+        changed = True
+        while changed:
+            changed = False
+            for name in list(pure):
+                if not collect_calls(functions[name]["Body"], set()) <= pure:
+                    pure.discard(name)
+                    changed = True
+        return pure
+
+    def nested_blocks(self, stmt):
+        kind = node_type(stmt)
+        value = stmt[kind]
+        if kind == "IfStatement":
+            return [value["Then"]["Block"]] + ([value["Else"]["Block"]] if value["Else"] is not None else [])
+        elif kind == "Loop":
+            return [value["Block"]["Block"]]
+        elif kind == "FunctionDef":
+            return [value["Body"]["Block"]]
+        return []
+
+    def prints(self, statements):
+        for stmt in statements:
+            kind = node_type(stmt)
+            if kind == "Output":
+                return True
+            if kind != "FunctionDef" and any(self.prints(block) for block in self.nested_blocks(stmt)):
+                return True
+        return False
+
+    def optimize_block(self, statements, scope, functions=None):
+        # Inner loops are optimized first. Their hoisted declarations sit inside the guard
+        # on the inner loop's condition, which the enclosing loop does not look into, so
+        # they are computed once per run of the inner loop rather than once overall.
+        # If given, functions yields (hoisted, temp_count) for each function in
+        # statements that another instance already optimized, in order.
+        optimized = []
+        for stmt in statements:
+            kind = node_type(stmt)
+            if functions is not None and kind == "FunctionDef":
+                stmt = self.adopt(stmt, *next(functions))
+            elif kind == "FunctionDef":
+                name = stmt[kind]["Name"]
+                stmt = rebuild_blocks(stmt, lambda block: self.optimize_block(block, f"function '{name}'"))
+            else:
+                stmt = rebuild_blocks(stmt, lambda block: self.optimize_block(block, scope))
+            if kind == "Loop":
+                optimized.extend(self.hoist_invariants(stmt, scope))
+            else:
+                optimized.append(stmt)
+        return optimized
+
+    def adopt(self, function, hoisted, temp_count):
+        # The other instance numbered its temporaries from zero
+        self.hoisted.extend(renumber_report(entry, "_licm", self.temp_count) for entry in hoisted)
+        function = renumber_temporaries(function, "_licm", self.temp_count) if temp_count else function
+        self.temp_count += temp_count
+        return function
+
+    def hoist_invariants(self, loop, scope):
+        condition = loop["Loop"]["Condition"]
+        body = loop["Loop"]["Block"]["Block"]
+        # The guard below evaluates the condition one extra time
+        if not is_pure(condition, self.pure_functions):
+            return [loop]
+
+        written = collect_assignments(body, set())
+        invariants = []
+        self.collect_invariants(condition, written, invariants)
+        # Only statements that run on every iteration are considered, so code
+        # guarded by an if or following a possible return never runs early
+        for stmt in body:
+            if contains_return([stmt]):
+                break
+            if node_type(stmt) == "FunctionDef":
+                continue
+            for expr in evaluated_expressions(stmt):
+                self.collect_invariants(expr, written, invariants)
+        if not invariants:
+            return [loop]
+
+        declarations = []
+        for expr in invariants:
+            temp = f"_licm{self.temp_count}"
+            self.temp_count += 1
+            self.hoisted.append(f"loop invariant into {temp} in {scope}")
+            declarations.append({"VarDeclaration": {"Identifier": temp, "Expression": expr, **source_line(loop)}})
+            loop = self.replace_in_loop(loop, expr, {"Identifier": temp})
+
+        if constant_value(condition):
+            return declarations + [loop]
+        # Hoisted code must not run when the loop body would not run at all
+        return [{"IfStatement": {"Condition": condition, "Then": {"Block": declarations + [loop]}, "Else": None,
+                                 **source_line(loop)}}]
+
+    def collect_invariants(self, expr, written, invariants):
+        # Collect the largest invariant subexpressions, in evaluation order
+        if isinstance(expr, list):
+            for item in expr:
+                self.collect_invariants(item, written, invariants)
+            return
+        if not isinstance(expr, dict):
+            return
+        kind = node_type(expr)
+        if (kind in self.CANDIDATES and is_pure(expr, self.pure_functions) and constant_value(expr) is None
+                and not collect_reads(expr, set()) & written):
+            if expr not in invariants:
+                invariants.append(expr)
+            return
+        for value in expr[kind].values() if isinstance(expr[kind], dict) else [expr[kind]]:
+            self.collect_invariants(value, written, invariants)
+
+    def replace_in_loop(self, stmt, target, replacement):
+        # The invariant has the same value everywhere in the loop, nested blocks included
+        kind = node_type(stmt)
+        if kind == "FunctionDef":
+            return stmt
+        if kind == "Loop":
+            value = stmt[kind]
+            stmt = {"Loop": dict(value, Condition=replace_expression(value["Condition"], target, replacement))}
+        else:
+            stmt = replace_in_statement(stmt, target, replacement)
+        return rebuild_blocks(stmt, lambda block: [self.replace_in_loop(nested, target, replacement) for nested in block])
+
+
+if __name__ == "__main__":
+    ast = json.load(sys.stdin)
+    eliminator = DeadCodeEliminator()
+    optimized = eliminator.eliminate(ast)
+    for entry in eliminator.removed:
+        print(f"Removed {entry}", file=sys.stderr)
+    licm = LoopInvariantCodeMotion()
+    optimized = licm.optimize(optimized)
+    for entry in licm.hoisted:
+        print(f"Hoisted {entry}", file=sys.stderr)
+    cse = CommonSubexpressionEliminator()
+    optimized = cse.eliminate(optimized)
+    for entry in cse.hoisted:
+        print(f"Hoisted {entry}", file=sys.stderr)
+    print(json.dumps(optimized, indent=4))
@@ -0,0 +1,221 @@
+import os
+import sys
+import glob
+import time
+import shlex
+import asyncio
+import argparse
+import contextlib
+from concurrent.futures import ProcessPoolExecutor
+from scanner import Scanner
+from parser import Parser
+from code_generator import CodeGenerator
+from regression import load_expected, expects_error
+
+# Lines the code generator reports on stderr, which the expected outputs include
+GENERATOR_REPORTS = ("Dead code eliminated: ", "Hoisted ")
+
+
+def generate_file(path, c_file):
+    # Runs in a worker process: scan, parse and generate C for one file. Returns an
+    # error message, or None once the C file is written.
+    try:
+        with open(path, "r") as f:
+            code = f.read()
+    except OSError as e:
+        return f"Cannot read {path}: {e.strerror}"
+    scanner = Scanner()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        tokens = scanner.scan(code + ' ')
+    if tokens is None:
+        return "Lexical error detected"
+    try:
+        ast = Parser(tokens, symbols=scanner.symbols).parse()
+        c_code = CodeGenerator(ast, interner=scanner.symbols).generate_code()
+    except SyntaxError as e:
+        return f"Syntax Error: {e}"
+    except Exception as e:
+        return str(e)
+    # Written like code_generator.sh does, with a single trailing newline
+    with open(c_file, "w") as f:
+        f.write(c_code.rstrip("\n") + "\n")
+    return None
+
+
+class Job:
+    def __init__(self, path, output_dir):
+        self.path = path
+        self.name = os.path.splitext(os.path.basename(path))[0]
+        self.c_file = os.path.join(output_dir, self.name + ".c")
+        self.executable = os.path.join(output_dir, self.name + "_a.out")
+        self.timings = {}
+        self.failed_stage = None
+        self.error = None
+
+
+class Orchestrator:
+    # Builds many files as a pipeline of three stages joined by bounded queues:
+    # the front end (scan, parse, generate) runs in a process pool, gcc and the
+    # compiled programs run as subprocesses. While gcc compiles one file, the front
+    # end is already working on the next ones, and each file's result is reported as
+    # soon as its last stage finishes.
+    def __init__(self, output_dir, jobs, frontend_jobs, queue_size, run, expected, cflags, timeout, out=None):
+        self.output_dir = output_dir
+        self.jobs = jobs
+        self.frontend_jobs = frontend_jobs
+        self.queue_size = queue_size
+        self.run = run
+        self.expected = expected
+        self.cflags = cflags
+        self.timeout = timeout
+        self.out = out if out is not None else sys.stdout
+        self.results = []
+
+    async def build(self, paths):
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.results = []
+        # At most this many gcc and program subprocesses run at once
+        self.subprocesses = asyncio.Semaphore(self.jobs)
+        self.pending = asyncio.Queue()
+        for path in paths:
+            self.pending.put_nowait(Job(path, self.output_dir))
+        self.compile_queue = asyncio.Queue(self.queue_size)
+        self.run_queue = asyncio.Queue(self.queue_size)
+
+        with ProcessPoolExecutor(max_workers=self.frontend_jobs) as executor:
+            front_ends = [asyncio.create_task(self.front_end(executor)) for _ in range(self.frontend_jobs)]
+            compilers = [asyncio.create_task(self.compiler()) for _ in range(self.jobs)]
+            runners = [asyncio.create_task(self.runner()) for _ in range(self.jobs)] if self.run else []
+            await asyncio.gather(*front_ends)
+            for _ in compilers:
+                await self.compile_queue.put(None)
+            await asyncio.gather(*compilers)
+            for _ in runners:
+                await self.run_queue.put(None)
+            await asyncio.gather(*runners)
+        return self.results
+
+    async def front_end(self, executor):
+        loop = asyncio.get_running_loop()
+        while not self.pending.empty():
+            job = self.pending.get_nowait()
+            start = time.perf_counter()
+            try:
+                error = await loop.run_in_executor(executor, generate_file, job.path, job.c_file)
+            except Exception as e:
+                # A worker that failed must not stop the other files, nor the later stages
+                error = str(e) or type(e).__name__
+            job.timings["front end"] = time.perf_counter() - start
+            if error is not None and self.expects_error(job):
+                self.finish(job)
+            elif error is not None:
+                self.finish(job, "front end", error)
+            else:
+                # Waits while the compilers are behind, so generated files do not pile up
+                await self.compile_queue.put(job)
+
+    async def compiler(self):
+        while True:
+            job = await self.compile_queue.get()
+            if job is None:
+                return
+            async with self.subprocesses:
+                start = time.perf_counter()
+                process = await asyncio.create_subprocess_exec(
+                    "gcc", *self.cflags, "-o", job.executable, job.c_file,
+                    stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE)
+                _, stderr = await process.communicate()
+                job.timings["gcc"] = time.perf_counter() - start
+            if process.returncode != 0:
+                self.finish(job, "gcc", stderr.decode().strip())
+            elif self.run:
+                await self.run_queue.put(job)
+            else:
+                self.finish(job)
+
+    async def runner(self):
+        while True:
+            job = await self.run_queue.get()
+            if job is None:
+                return
+            async with self.subprocesses:
+                start = time.perf_counter()
+                process = await asyncio.create_subprocess_exec(
+                    job.executable, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL)
+                try:
+                    stdout, _ = await asyncio.wait_for(process.communicate(), self.timeout)
+                except asyncio.TimeoutError:
+                    process.kill()
+                    await process.wait()
+                    stdout = None
+                job.timings["run"] = time.perf_counter() - start
+            # Only the .c file is kept, as with code_generator.sh
+            os.remove(job.executable)
+            if stdout is None:
+                self.finish(job, "run", f"timed out after {self.timeout} s")
+            elif process.returncode != 0:
+                self.finish(job, "run", f"exited with status {process.returncode}")
+            elif not self.matches_expected(job, stdout.decode()):
+                self.finish(job, "compare", "output differs from the expected output")
+            else:
+                self.finish(job)
+
+    def expects_error(self, job):
+        # Samples whose expected output is an error message instead of C code
+        section = self.expected.get(job.name + ".litel")
+        return section is not None and expects_error(section)
+
+    def matches_expected(self, job, output):
+        section = self.expected.get(job.name + ".litel")
+        if section is None or "Terminal output:" not in section:
+            return True
+        expected = section.split("Terminal output:", 1)[1].strip("\n").split("\n")
+        expected = [line for line in expected if not line.startswith(GENERATOR_REPORTS)]
+        return [line.rstrip() for line in output.strip("\n").split("\n")] == [line.rstrip() for line in expected]
+
+    def finish(self, job, failed_stage=None, error=None):
+        job.failed_stage = failed_stage
+        job.error = error
+        self.results.append(job)
+        timings = ", ".join(f"{stage} {seconds * 1000:.0f} ms" for stage, seconds in job.timings.items())
+        if failed_stage is None:
+            print(f"{job.path}: ok ({timings})", file=self.out)
+        else:
+            print(f"{job.path}: FAILED in {failed_stage} ({timings})", file=self.out)
+            for line in error.split("\n"):
+                print(f"    {line}", file=self.out)
+        self.out.flush()
+
+
+def main():
+    argparser = argparse.ArgumentParser(description="Build many LiteLang files with overlapping front end, gcc and run stages.")
+    argparser.add_argument("sources", nargs="+", help=".litel files, or directories whose .litel files are built")
+    argparser.add_argument("--output-dir", default="output_c_files")
+    argparser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="gcc and program subprocesses running at once")
+    argparser.add_argument("--frontend-jobs", type=int, default=1, help="processes scanning, parsing and generating C")
+    argparser.add_argument("--queue-size", type=int, default=4, help="files waiting between two stages")
+    argparser.add_argument("--run", action="store_true", help="run every compiled program")
+    argparser.add_argument("--expected", help="a sample_output.txt whose terminal outputs the programs must print (implies --run)")
+    argparser.add_argument("--cflags", default="", help="extra gcc flags, e.g. --cflags=\"-O2\"")
+    argparser.add_argument("--timeout", type=float, default=10, help="seconds a program may run")
+    args = argparser.parse_args()
+
+    paths = []
+    for source in args.sources:
+        if os.path.isdir(source):
+            paths += sorted(glob.glob(os.path.join(source, "*.litel")))
+        else:
+            paths.append(source)
+    expected = load_expected(args.expected) if args.expected else {}
+    orchestrator = Orchestrator(args.output_dir, args.jobs, args.frontend_jobs, args.queue_size,
+                                args.run or args.expected is not None, expected, shlex.split(args.cflags), args.timeout)
+    results = asyncio.run(orchestrator.build(paths))
+
+    failed = [job for job in results if job.failed_stage is not None]
+    print(f"{len(results) - len(failed)} built, {len(failed)} failed")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,58 @@
 import sys
 import re
 import json
+from symbols import Interner
 
 class Parser:
-    def __init__(self, tokens):
-        self.tokens = tokens
-        self.pos = 0
+    def __init__(self, tokens, lines=None, symbols=None):
+        # Tokens are read one at a time, so they may come from a list or be produced
+        # lazily, e.g. by Scanner.scan_lazily; only the next two are held
+        self.tokens = iter(tokens)
+        self.next_token = None
+        self.token = None
+        # Identifier ids, shared with the scanner when it is run in-process
+        self.symbols = symbols if symbols is not None else Interner()
+        # Source line of each token, if the scanner provided them
+        self.lines = lines
+        # Number of tokens consumed
+        self.pos = -1
+        self.advance()
+
+    def advance(self):
+        if self.next_token is not None:
+            self.token, self.next_token = self.next_token, None
+        else:
+            self.token = next(self.tokens, None)
+        self.pos += 1
 
     def current_token(self):
-        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+        return self.token
+
+    def peek_token(self):
+        # The token after the current one
+        if self.next_token is None and self.token is not None:
+            self.next_token = next(self.tokens, None)
+        return self.next_token
+
+    def add_line(self, stmt, pos):
+        # Record the source line of a statement's first token, when line numbers are
+        # known. The line goes into the statement's node, except for statements whose
+        # node is an expression, which keep it next to their kind instead.
+        if self.lines is not None and pos < len(self.lines):
+            kind = list(stmt.keys())[0]
+            if kind in ("Output", "Return") or not isinstance(stmt[kind], dict):
+                stmt["Line"] = self.lines[pos]
+            else:
+                stmt[kind]["Line"] = self.lines[pos]
+        return stmt
 
     def match(self, expected_type, expected_value=None):
         token = self.current_token()
         if (token and token[0] == expected_type) and ((expected_value is None) or (token[1] == expected_value)):
-            self.pos += 1
+            self.advance()
+            if expected_type == "IDENTIFIER":
+                # Tokens read back from text are new strings; equal names share one again
+                return (token[0], self.symbols.name(self.symbols.intern(token[1])))
             return token
         else:
             expected = f"{expected_type} '{expected_value}'" if expected_value else expected_type
@@ -24,12 +63,19 @@ class Parser:
         return self.parse_program()
 
     def parse_program(self):
-        statements = []
+        return {"Program": list(self.parse_statements())}
+
+    def parse_statements(self):
+        # Yield each top-level statement as soon as it is parsed, so a caller can
+        # process a program without holding its whole AST
         while self.current_token():
-            statements.append(self.parse_statement())
-        return {"Program": statements}
+            yield self.parse_statement()
 
     def parse_statement(self):
+        start = self.pos
+        return self.add_line(self.parse_statement_kind(), start)
+
+    def parse_statement_kind(self):
         token = self.current_token()
         if token[0] == "KEYWORD":
             if token[1] == "make":
@@ -46,6 +92,8 @@ class Parser:
                 return self.parse_loop()
             elif token[1] == "def":
                 return self.parse_function_def()
+            elif token[1] == "import":
+                return self.parse_import()
             elif token[1] == ";":
                 self.match("KEYWORD", ";")
                 return {"EmptyStatement": ";"}
@@ -53,7 +101,7 @@ class Parser:
                 raise SyntaxError(f"Unexpected keyword: {token[1]}")
         elif token[0] == "IDENTIFIER":
             # Could be an assignment or an expression
-            next_token = self.tokens[self.pos + 1] if self.pos + 1 < len(self.tokens) else None
+            next_token = self.peek_token()
             if next_token and (next_token[0] == "OPERATOR" and next_token[1] == "=") or next_token[0] == "LBRACKET":
                 return self.parse_assignment()
             else:
@@ -139,6 +187,12 @@ class Parser:
         body = self.parse_block()
         return {"FunctionDef": {"Name": func_name[1], "Parameters": parameters, "Body": body}}
 
+    def parse_import(self):
+        self.match("KEYWORD", "import")
+        module = self.match("IDENTIFIER")
+        self.match("SEMICOLON")
+        return {"Import": module[1]}
+
     def parse_parameter_list(self):
         params = []
         if self.current_token() and self.current_token()[0] == "IDENTIFIER":
@@ -327,6 +381,7 @@ class Parser:
 
 def main():
     tokens = []
+    lines = []
     try:
         # Read tokens from stdin
         for line in sys.stdin:
@@ -335,12 +390,16 @@ def main():
                 token_type = match.group(1)
                 token_value = match.group(2).strip()
                 tokens.append((token_type, token_value))
+                # Tokens scanned with --lines are followed by their line number
+                line_number = line.strip()[match.end():].strip()
+                if line_number:
+                    lines.append(int(line_number))
             else:
                 print(f"Invalid token format: {line.strip()}", file=sys.stderr)
                 sys.exit(1)
 
         # Parse tokens into AST
-        parser = Parser(tokens)
+        parser = Parser(tokens, lines if len(lines) == len(tokens) and lines else None)
         ast = parser.parse()
 
         # Debug output to stderr
@@ -0,0 +1,58 @@
+import sys
+import json
+
+
+def read_profile(filename):
+    try:
+        with open(filename, 'r') as file:
+            return json.load(file)
+    except FileNotFoundError:
+        print(f"Error: The profile '{filename}' was not found. Please run the profiling build first.")
+        sys.exit(1)
+    except json.JSONDecodeError as e:
+        print(f"Error: The profile '{filename}' is not valid JSON: {e}")
+        sys.exit(1)
+
+
+def percent(cycles, total):
+    return 100.0 * cycles / total if total else 0.0
+
+
+def format_report(profile, top=10):
+    total = profile["total_cycles"]
+    source = profile["source"]
+    functions = [r for r in profile["regions"] if r["kind"] == "function"]
+    loops = [r for r in profile["regions"] if r["kind"] == "loop"]
+    functions.sort(key=lambda r: r["cycles"], reverse=True)
+    loops.sort(key=lambda r: r["cycles"], reverse=True)
+
+    lines = [f"Profile of {source} ({total} {profile['timer']} total)", ""]
+    lines.append("Hottest functions:")
+    lines.append(f"  {'cycles':>14} {'time':>7} {'calls':>10}  location")
+    for region in functions[:top]:
+        lines.append(f"  {region['cycles']:>14} {percent(region['cycles'], total):>6.1f}% {region['entries']:>10}"
+                     f"  {region['name']} ({source}:{region['line']})")
+    if not functions:
+        lines.append("  (no functions)")
+    lines.append("")
+    lines.append("Hottest loops:")
+    lines.append(f"  {'cycles':>14} {'time':>7} {'entries':>10} {'iterations':>12}  location")
+    for region in loops[:top]:
+        lines.append(f"  {region['cycles']:>14} {percent(region['cycles'], total):>6.1f}% {region['entries']:>10}"
+                     f" {region['iterations']:>12}  check in {region['name']} ({source}:{region['line']})")
+    if not loops:
+        lines.append("  (no loops)")
+    return "\n".join(lines)
+
+
+def main():
+    if len(sys.argv) not in (2, 3):
+        print("Usage: python3 profile_report.py <profile.json> [top_n]")
+        sys.exit(1)
+    profile = read_profile(sys.argv[1])
+    top = int(sys.argv[2]) if len(sys.argv) == 3 else 10
+    print(format_report(profile, top))
+
+
+if __name__ == "__main__":
+    main()
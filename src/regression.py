@@ -0,0 +1,181 @@
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+import contextlib
+from scanner import Scanner, read_input_file
+from parser import Parser
+from code_generator import CodeGenerator
+
+SUITES = {
+    "sample_lexer_programs": "scan",
+    "sample_parser_programs": "parse",
+    "sample_code_generator_programs": "generate",
+}
+STAGES = ["scan", "parse", "generate"]
+SECTION_HEADER = re.compile(r"^(sample\d+\.litel)( -> \S+)?:$")
+
+
+def load_expected(path):
+    # Split a sample_output.txt file into the sections for each sample
+    sections = {}
+    current = None
+    with open(path, "r") as f:
+        for line in f.read().split("\n"):
+            match = SECTION_HEADER.match(line)
+            if match:
+                current = match.group(1)
+                sections[current] = []
+            elif current is not None:
+                sections[current].append(line)
+    return {name: "\n".join(lines).strip() for name, lines in sections.items()}
+
+
+def expects_error(expected):
+    # Samples whose expected output is an error message rather than a stage's result
+    return expected.startswith(("Error", "Lexical error"))
+
+
+def scan(code):
+    scanner = Scanner()
+    # Lexical errors are expected for some samples; the harness reports its own failures
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        tokens = scanner.scan(code + ' ')
+    return tokens, scanner.symbols
+
+
+def run_stages(code, last_stage):
+    # Run the pipeline up to last_stage and return every stage's result;
+    # a stage that fails leaves None for itself and the stages after it
+    results = dict.fromkeys(STAGES)
+    tokens, symbols = scan(code)
+    results["scan"] = tokens
+    if tokens is None or last_stage == "scan":
+        return results
+    try:
+        results["parse"] = Parser(tokens, symbols=symbols).parse()
+    except SyntaxError:
+        return results
+    if last_stage == "parse":
+        return results
+    try:
+        results["generate"] = CodeGenerator(results["parse"], interner=symbols).generate_code()
+    except Exception:
+        pass
+    return results
+
+
+def check_output(suite, results, expected):
+    # Compare a sample's result with the section of its suite's sample_output.txt.
+    # Samples that are expected to fail only need to fail at some stage.
+    stage = SUITES[suite]
+    if expects_error(expected):
+        return results[stage] is None
+    if suite == "sample_lexer_programs":
+        return "\n".join(f"<{token[0]}, {token[1]}>" for token in results["scan"]) == expected
+    elif suite == "sample_parser_programs":
+        ast_repr = expected.split("AST:\n")[-1].strip()
+        return results["parse"] is not None and repr(results["parse"]) == ast_repr
+    else:
+        expected_c = expected.split("\nTerminal output:")[0].strip()
+        return results["generate"] is not None and results["generate"].strip() == expected_c
+
+
+def measure(stage, inputs, repeat):
+    # Time a stage over all inputs, taking each input's fastest run, and record the
+    # peak memory allocated by the stage in a separate, traced run
+    total_seconds = 0.0
+    peak_bytes = 0
+    for code in inputs:
+        tokens, symbols = scan(code)
+        ast = Parser(tokens, symbols=symbols).parse() if stage == "generate" else None
+        if stage == "scan":
+            run = lambda: scan(code)
+        elif stage == "parse":
+            run = lambda: Parser(tokens, symbols=symbols).parse()
+        else:
+            run = lambda: CodeGenerator(ast, interner=symbols).generate_code()
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        tracemalloc.start()
+        run()
+        peak_bytes = max(peak_bytes, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        total_seconds += best
+    return {"seconds": total_seconds, "peak_bytes": peak_bytes}
+
+
+def compare(current, baseline, threshold):
+    # Return a line for every stage that got slower or used more memory than
+    # the baseline allows
+    regressions = []
+    for stage in STAGES:
+        for metric, unit, scale in (("seconds", "ms", 1000), ("peak_bytes", "KiB", 1 / 1024)):
+            before = baseline[stage][metric]
+            after = current[stage][metric]
+            if before and after > before * (1 + threshold):
+                regressions.append(f"{stage}: {metric} went from {before * scale:.1f} {unit} to {after * scale:.1f} {unit} "
+                                   f"({(after / before - 1) * 100:+.0f}%)")
+    return regressions
+
+
+def main():
+    argparser = argparse.ArgumentParser(description="Check sample outputs and the time and memory of every compiler stage.")
+    argparser.add_argument("--tests-dir", default="tests")
+    argparser.add_argument("--baseline", default=os.path.join("build", "performance_baseline.json"))
+    argparser.add_argument("--update", action="store_true", help="record the current measurements as the new baseline")
+    argparser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown or memory growth, as a fraction")
+    argparser.add_argument("--repeat", type=int, default=5, help="timed runs per input; the fastest is used")
+    argparser.add_argument("--scale", type=int, default=100, help="how often each sample is repeated in its scaled-up variant")
+    args = argparser.parse_args()
+
+    failures = []
+    valid_sources = []
+    checked = 0
+    for suite in SUITES:
+        directory = os.path.join(args.tests_dir, suite)
+        expected = load_expected(os.path.join(directory, "sample_output.txt"))
+        for name in sorted(expected, key=lambda name: int(re.sub(r"\D", "", name))):
+            code = read_input_file(os.path.join(directory, name))
+            results = run_stages(code, SUITES[suite])
+            checked += 1
+            if not check_output(suite, results, expected[name]):
+                failures.append(f"{suite}/{name}: output differs from sample_output.txt")
+            if results[SUITES[suite]] is not None:
+                valid_sources.append(code)
+    print(f"Checked {checked} samples, {len(failures)} failed")
+
+    # The scaled-up variants repeat every sample that compiles, so that stage
+    # times are long enough to measure reliably
+    inputs = [code for code in valid_sources if run_stages(code, "generate")["generate"] is not None]
+    inputs += ["\n".join([code] * args.scale) for code in inputs]
+    current = {stage: measure(stage, inputs, args.repeat) for stage in STAGES}
+    for stage in STAGES:
+        print(f"{stage:<10}{current[stage]['seconds'] * 1000:>10.1f} ms{current[stage]['peak_bytes'] / 1024:>12.0f} KiB peak")
+
+    if args.update:
+        os.makedirs(os.path.dirname(args.baseline) or ".", exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(current, f, indent=4)
+        print(f"Baseline written to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, "r") as f:
+            failures += compare(current, json.load(f), args.threshold)
+    else:
+        print(f"No baseline at {args.baseline}; record one with --update")
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,71 @@
+import io
+import os
+import re
 import sys
+import contextlib
+from concurrent.futures import ProcessPoolExecutor
+from symbols import Interner
+
+# Sources shorter than this are not worth sending to other processes
+PARALLEL_THRESHOLD = 1 << 20
+# Characters that start a string literal or a comment
+STRING_OR_COMMENT = re.compile(r'"|//')
+
+class LexicalError(Exception):
+    pass
+
 
 class Scanner:
     def __init__(self):
         self.state = 'START'
         self.tokens = []
+        self.positions = []
         self.current_char = ''
+        # Identifier ids are kept across scans, so files scanned by one scanner share them
+        self.symbols = Interner()
+        # Offset of the scanned code in the whole source, when scanning one chunk of it
+        self.offset = 0
+
+    def add_token(self, token_type, value, position):
+        # Record the token together with the offset of its first character
+        self.tokens.append((token_type, value))
+        self.positions.append(self.offset + position)
+
+    def line_numbers(self, code):
+        # Map each token's offset to its 1-based line number in code
+        lines = []
+        line = 1
+        offset = 0
+        for position in self.positions:
+            line += code.count('\n', offset, position)
+            offset = position
+            lines.append(line)
+        return lines
+
+    def scan(self, code, offset=0):
+        self.tokens = []
+        self.positions = []
+        try:
+            for token_type, value, position in self.read_tokens(code, offset):
+                self.add_token(token_type, value, position)
+        except LexicalError as e:
+            print(e)
+            return
+        return self.tokens
+
+    def scan_lazily(self, code):
+        # Yield tokens one at a time instead of collecting them, so that a caller
+        # consuming them as it goes never holds all of them. A lexical error is
+        # raised as a LexicalError once the tokens before it have been consumed.
+        for token_type, value, _ in self.read_tokens(code):
+            yield (token_type, value)
 
-    def scan(self, code):
+    def read_tokens(self, code, offset=0):
+        # Yield each token with the offset of its first character in code
         i = 0
         start = 0
+        self.offset = offset
         self.state = 'START'
-        self.tokens = []
         self.current_char = ''
         keywords = {
             "make", 
@@ -20,7 +75,8 @@ class Scanner:
             "else", 
             "return",
             "def",
-            "call"
+            "call",
+            "import"
         }
         operators = {
             "add": "+",
@@ -70,40 +126,39 @@ class Scanner:
                     i += 1
                 # Add LPAR to tokens list
                 elif self.current_char == '(':
-                    self.tokens.append(('LPAR', '('))
+                    yield ('LPAR', '(', i)
                     i += 1
                 # Add RPAR to tokens list
                 elif self.current_char == ')':
-                    self.tokens.append(('RPAR', ')'))
+                    yield ('RPAR', ')', i)
                     i += 1
                 # Add LBRACKET to token list
                 elif self.current_char == '[': 
-                    self.tokens.append(('LBRACKET', '['))
+                    yield ('LBRACKET', '[', i)
                     i += 1
                 # Add RBRACKET to token list
                 elif self.current_char == ']': 
-                    self.tokens.append(('RBRACKET', ']'))
+                    yield ('RBRACKET', ']', i)
                     i += 1
                 # Add COMMA to tokens list
                 elif self.current_char == ',':
-                    self.tokens.append(('COMMA', ','))
+                    yield ('COMMA', ',', i)
                     i += 1
                 # Add LBRACE to tokens list
                 elif self.current_char == '{':
-                    self.tokens.append(('LBRACE', '{'))
+                    yield ('LBRACE', '{', i)
                     i += 1
                 # Add RBRACE to tokens list
                 elif self.current_char == '}':
-                    self.tokens.append(('RBRACE', '}'))
+                    yield ('RBRACE', '}', i)
                     i += 1
                 # Add SEMICOLON to tokens list
                 elif self.current_char == ';':
-                    self.tokens.append(('SEMICOLON', ';'))
+                    yield ('SEMICOLON', ';', i)
                     i += 1
                 # Scanned unexpected character
                 else:
-                    print(f"Lexical error: Unexpected character '{self.current_char}' at position {i}")
-                    return
+                    raise LexicalError(f"Lexical error: Unexpected character '{self.current_char}' at position {self.offset + i}")
                 
             # State for handling comments
             elif self.state == 'COMMENT':
@@ -118,11 +173,12 @@ class Scanner:
                 else:
                     identifier = code[start:i]
                     if identifier in keywords:
-                        self.tokens.append(('KEYWORD', identifier))
+                        yield ('KEYWORD', identifier, start)
                     elif identifier in operators:
-                        self.tokens.append(('OPERATOR', operators[identifier]))
+                        yield ('OPERATOR', operators[identifier], start)
                     else:
-                        self.tokens.append(('IDENTIFIER', identifier))
+                        symbol = self.symbols.intern(identifier)
+                        yield ('IDENTIFIER', self.symbols.name(symbol), start)
                     self.state = 'START'  # Reinitialize state
                     start = i  # Reset start for the next token
 
@@ -135,12 +191,11 @@ class Scanner:
                     self.state = 'FLOAT'
                     i += 1
                 elif self.current_char.isalpha():  # Error: numbers followed by letters
-                    print(f"Lexical error: Invalid token starting with a number at position {start}.")
-                    return
+                    raise LexicalError(f"Lexical error: Invalid token starting with a number at position {self.offset + start}.")
                 else:
                     # If we don't encounter a '.', this is an integer
                     number = code[start:i]
-                    self.tokens.append(('INTLITERAL', number))
+                    yield ('INTLITERAL', number, start)
                     self.state = 'START'
                     start = i
 
@@ -150,15 +205,13 @@ class Scanner:
                     i += 1
                 elif self.current_char == '.':
                     # If a number has more than one decimal point
-                    print(f"Lexical error: Invalid float format with multiple decimal points at position {i}.")
-                    return
+                    raise LexicalError(f"Lexical error: Invalid float format with multiple decimal points at position {self.offset + i}.")
                 elif self.current_char.isalpha():  # Error: numbers followed by letters
-                    print(f"Lexical error: Invalid token starting with a number at position {start}.")
-                    return
+                    raise LexicalError(f"Lexical error: Invalid token starting with a number at position {self.offset + start}.")
                 else:
                     # Read complete
                     float_number = code[start:i]
-                    self.tokens.append(('FLOATLITERAL', float_number))
+                    yield ('FLOATLITERAL', float_number, start)
                     self.state = 'START'
                     start = i
 
@@ -166,21 +219,88 @@ class Scanner:
             elif self.state == 'STRING':
                 if self.current_char == '"':  # Closing quote
                     string_literal = code[start:i+1]
-                    self.tokens.append(('STRINGLITERAL', string_literal))
+                    yield ('STRINGLITERAL', string_literal, start)
                     self.state = 'START'  # Reinitialize state
                     i += 1  # Move past the closing quote
                     start = i  # Reset start for the next token
                 elif i == len(code) - 1:  # If the string reaches the end without closing
-                    print(f"Lexical error: Unterminated string literal at position {start}.")
-                    return
+                    raise LexicalError(f"Lexical error: Unterminated string literal at position {self.offset + start}.")
                 else:
                     i += 1  # Continue reading string literal
 
             else:
                 print(f"Lexical error: Unexpected character '{self.current_char}' at position {self.position}.")
 
+    def scan_parallel(self, code, jobs=None):
+        # Scan chunks of the source in a process pool. The result, the identifier ids
+        # and any error message are the same as those of scan(code).
+        jobs = jobs or os.cpu_count() or 1
+        # More chunks than workers, so that a worker that finishes early picks up another
+        chunks = split_points(code, jobs * 4) if len(code) >= PARALLEL_THRESHOLD else []
+        if not chunks:
+            return self.scan(code)
+        bounds = [0] + chunks + [len(code)]
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = executor.map(scan_chunk, [code[start:end] for start, end in zip(bounds, bounds[1:])], bounds)
+
+            self.tokens = []
+            self.positions = []
+            intern = self.symbols.intern
+            name = self.symbols.name
+            for tokens, positions, error in results:
+                # Identifiers are re-interned in source order, so ids match a sequential scan
+                self.tokens.extend((token_type, name(intern(value))) if token_type == 'IDENTIFIER' else (token_type, value)
+                                   for token_type, value in tokens)
+                self.positions.extend(positions)
+                if error:
+                    # Like scan(), stop at the first lexical error in the source
+                    print(error, end='')
+                    executor.shutdown(cancel_futures=True)
+                    return
         return self.tokens
-    
+
+
+def scan_chunk(chunk, offset):
+    # Runs in a worker process; lexical errors are passed back to be printed in order
+    scanner = Scanner()
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        tokens = scanner.scan(chunk, offset)
+    return scanner.tokens, scanner.positions, output.getvalue() if tokens is None else None
+
+
+def split_points(code, count):
+    # Offsets at which the source can be cut into about count chunks that scan
+    # independently: line starts that are not inside a string literal or a comment.
+    # Every token ends at a newline, so the scanner is between tokens there.
+    targets = [len(code) * k // count for k in range(1, count)]
+    points = []
+    t = 0
+    pos = 0
+    while t < len(targets):
+        match = STRING_OR_COMMENT.search(code, pos)
+        region_end = match.start() if match else len(code)
+        # Any line start from pos up to region_end is outside strings and comments
+        while t < len(targets):
+            low = max(targets[t], pos, points[-1] + 1 if points else 1)
+            newline = code.find('\n', low - 1, region_end)
+            if newline == -1:
+                break
+            if newline + 1 < len(code):
+                points.append(newline + 1)
+            t += 1
+        if t == len(targets) or match is None:
+            break
+        # Skip the string literal or comment
+        if match.group() == '"':
+            end = code.find('"', match.end())
+        else:
+            end = code.find('\n', match.end())
+        if end == -1:
+            break
+        pos = end + 1
+    return points
+
 
 
 def read_input_file(filename):
@@ -195,12 +315,23 @@ def read_input_file(filename):
         sys.exit(1)
 
 def main():
-    if len(sys.argv) != 2:
-        print("Usage: python3 scanner.py <input_file.lang>")
+    args = sys.argv[1:]
+    # --lines appends each token's source line number, for the profiling build
+    with_lines = "--lines" in args
+    if with_lines:
+        args.remove("--lines")
+    # --jobs N scans large sources in N processes
+    jobs = None
+    if "--jobs" in args:
+        index = args.index("--jobs")
+        jobs = int(args[index + 1])
+        del args[index:index + 2]
+    if len(args) != 1:
+        print("Usage: python3 scanner.py [--lines] [--jobs N] <input_file.lang>")
         print("Please provide exactly one input file for the scanner.")
         sys.exit(1)
 
-    input_file = sys.argv[1]
+    input_file = args[0]
 
     code = read_input_file(input_file)
 
@@ -208,11 +339,15 @@ def main():
     code += ' '
 
     scanner = Scanner()
-    tokens = scanner.scan(code)
+    tokens = scanner.scan(code) if jobs is None else scanner.scan_parallel(code, jobs)
 
     if tokens:
-        for token in tokens:
-            print(f"<{token[0]}, {token[1]}>")
+        if with_lines:
+            for token, line in zip(tokens, scanner.line_numbers(code)):
+                print(f"<{token[0]}, {token[1]}> {line}")
+        else:
+            for token in tokens:
+                print(f"<{token[0]}, {token[1]}>")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,42 @@
+import os
+import sys
+import contextlib
+from scanner import Scanner, LexicalError, read_input_file
+from parser import Parser
+from code_generator import CodeGenerator
+
+
+def main():
+    if len(sys.argv) != 3:
+        print("Usage: python3 stream.py <source_file.litel> <output_file.c>")
+        sys.exit(1)
+    source, output = sys.argv[1], sys.argv[2]
+
+    code = read_input_file(source)
+    # Append a whitespace to the end of the code to ensure proper token detection
+    code += ' '
+
+    # Tokens are scanned as the parser asks for them, and each top-level statement is
+    # parsed, translated and written out before the next one is parsed
+    scanner = Scanner()
+    generator = CodeGenerator({"Program": []}, interner=scanner.symbols)
+    try:
+        with open(output, "w") as out:
+            parser = Parser(scanner.scan_lazily(code), symbols=scanner.symbols)
+            generator.generate_stream(parser.parse_statements(), out)
+    except LexicalError as e:
+        print(e)
+        print("Error: Lexical error detected. Aborting.", file=sys.stderr)
+    except SyntaxError as e:
+        print(f"Syntax Error: {e}", file=sys.stderr)
+    except Exception as e:
+        print(e, file=sys.stderr)
+    else:
+        return
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(output)
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
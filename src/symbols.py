@@ -0,0 +1,192 @@
+import sys
+from collections import deque
+from optimizer import collect_calls
+
+
+class Interner:
+    # Assigns a small integer id to every distinct identifier, in order of first appearance
+    def __init__(self):
+        self.ids = {}
+        self.names = []
+
+    def intern(self, name):
+        symbol = self.ids.get(name)
+        if symbol is None:
+            name = sys.intern(name)
+            symbol = len(self.names)
+            self.ids[name] = symbol
+            self.names.append(name)
+        return symbol
+
+    def name(self, symbol):
+        return self.names[symbol]
+
+
+class SymbolTable:
+    # Bindings are stored in a list indexed by symbol id. Each binding remembers the
+    # frame (function body) it was made in, so entering a function hides every outer
+    # binding without copying anything. Scopes are marks in an undo log: leaving a
+    # scope restores only the bindings made inside it.
+    def __init__(self, interner=None):
+        self.interner = interner if interner is not None else Interner()
+        self.bindings = []
+        self.undo = []
+        self.marks = []
+        self.frames = []
+        self.frame = 0
+        self.next_frame = 1
+
+    def push_scope(self):
+        self.marks.append(len(self.undo))
+
+    def pop_scope(self):
+        mark = self.marks.pop()
+        bindings = self.bindings
+        undo = self.undo
+        while len(undo) > mark:
+            symbol, previous = undo.pop()
+            bindings[symbol] = previous
+
+    def push_frame(self):
+        self.frames.append(self.frame)
+        self.frame = self.next_frame
+        self.next_frame += 1
+        self.push_scope()
+
+    def pop_frame(self):
+        self.pop_scope()
+        self.frame = self.frames.pop()
+
+    def declare(self, name, value):
+        symbol = self.interner.intern(name)
+        bindings = self.bindings
+        if symbol >= len(bindings):
+            bindings.extend([None] * (symbol + 1 - len(bindings)))
+        self.undo.append((symbol, bindings[symbol]))
+        bindings[symbol] = (self.frame, value)
+        return symbol
+
+    def lookup(self, name, default=None):
+        symbol = self.interner.ids.get(name)
+        if symbol is None:
+            return default
+        return self.lookup_symbol(symbol, default)
+
+    def lookup_symbol(self, symbol, default=None):
+        if symbol >= len(self.bindings):
+            return default
+        binding = self.bindings[symbol]
+        if binding is None or binding[0] != self.frame:
+            return default
+        return binding[1]
+
+
+def infer_function_signatures(program_body, interner=None, imported=None, signatures=None):
+    # Infer every function's return type before any code is generated, so calls are
+    # typed correctly even when they come before the function's definition. Return
+    # types of functions imported from other modules are known up front. Passing
+    # signatures adds the inferred types to that dict instead of a new one.
+    functions = []
+    collect_functions(program_body, functions)
+    callers = {}
+    for function in functions:
+        for name in collect_calls(function["Body"]["Block"], set()):
+            callers.setdefault(name, []).append(function)
+
+    # Functions are inferred in source order. A return type can depend on the functions
+    # a function calls, so when one changes, only its callers are inferred again.
+    if signatures is None:
+        signatures = {}
+    signatures.update(imported or {})
+    pending = deque(functions)
+    queued = {id(function) for function in functions}
+    inferred = {}
+    while pending:
+        function = pending.popleft()
+        queued.discard(id(function))
+        # Return types that keep changing are settled after as many rounds as the
+        # repeated whole-program passes would have taken
+        inferred[id(function)] = inferred.get(id(function), 0) + 1
+        if inferred[id(function)] > len(functions) + 1:
+            continue
+        symbols = SymbolTable(interner)
+        for parameter in function["Parameters"]:
+            symbols.declare(parameter, "int")
+        return_type = first_return_type(function["Body"]["Block"], symbols, signatures) or "int"
+        if signatures.get(function["Name"]) != return_type:
+            signatures[function["Name"]] = return_type
+            for caller in callers.get(function["Name"], []):
+                if id(caller) not in queued:
+                    queued.add(id(caller))
+                    pending.append(caller)
+    return signatures
+
+
+def collect_functions(statements, functions):
+    # Every function definition, nested ones included, in source order
+    for stmt in statements:
+        if "FunctionDef" in stmt:
+            functions.append(stmt["FunctionDef"])
+        for block in nested_blocks(stmt):
+            collect_functions(block, functions)
+    return functions
+
+
+def nested_blocks(stmt):
+    kind = list(stmt.keys())[0]
+    value = stmt[kind]
+    if kind == "IfStatement":
+        return [value["Then"]["Block"]] + ([value["Else"]["Block"]] if value["Else"] is not None else [])
+    elif kind == "Loop":
+        return [value["Block"]["Block"]]
+    elif kind == "FunctionDef":
+        return [value["Body"]["Block"]]
+    return []
+
+
+def first_return_type(statements, symbols, signatures):
+    # The first return statement in source order decides a function's return type
+    for stmt in statements:
+        kind = list(stmt.keys())[0]
+        value = stmt[kind]
+        if kind == "VarDeclaration":
+            symbols.declare(value["Identifier"], expression_type(value["Expression"], symbols, signatures))
+        elif kind == "Return":
+            return expression_type(value, symbols, signatures)
+        elif kind != "FunctionDef":
+            for block in nested_blocks(stmt):
+                symbols.push_scope()
+                return_type = first_return_type(block, symbols, signatures)
+                symbols.pop_scope()
+                if return_type is not None:
+                    return return_type
+    return None
+
+
+def expression_type(expr, symbols, signatures):
+    # The LiteLang type of an expression: int, float, string, or a list type such as int[]
+    kind = list(expr.keys())[0]
+    value = expr[kind]
+    if kind == "IntegerLiteral":
+        return "int"
+    elif kind == "FloatLiteral":
+        return "float"
+    elif kind == "StringLiteral":
+        return "string"
+    elif kind == "Identifier":
+        return symbols.lookup(value, "int").replace("[]", "")
+    elif kind == "IndexedIdentifier":
+        return symbols.lookup(value["Identifier"], "int").replace("[]", "")
+    elif kind == "FunctionCall":
+        return signatures.get(value["Name"], "int")
+    elif kind in ("Term", "ArithmeticExpression"):
+        left_type = expression_type(value["Left"], symbols, signatures)
+        right_type = expression_type(value["Right"], symbols, signatures)
+        return "float" if "float" in (left_type, right_type) else "int"
+    elif kind == "RelationalExpression":
+        return "int"
+    elif kind == "UnaryExpression":
+        return expression_type(value["Operand"], symbols, signatures)
+    elif kind == "ListExpression":
+        return (value["Type"] or "int") + "[]"
+    raise Exception(f"Unknown expression node type: {kind}")
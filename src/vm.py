@@ -0,0 +1,167 @@
+import sys
+import contextlib
+from scanner import Scanner, read_input_file
+from parser import Parser
+from bytecode import (BytecodeCompiler, LOAD_CONST, LOAD_LOCAL, STORE_LOCAL, INDEX, STORE_INDEX,
+                      ADD, SUB, MUL, DIV_INT, DIV_FLOAT, LT, GT, LE, GE, EQ, NE, NEG, TO_INT,
+                      JUMP, JUMP_IF_FALSE, CALL, RETURN, POP, PRINT_INT, PRINT_FLOAT, PRINT_STR, MAKE_LIST)
+
+
+class VirtualMachine:
+    def __init__(self, constants, functions, out=None):
+        self.constants = constants
+        self.functions = functions
+        self.out = out if out is not None else sys.stdout
+
+    def run(self, entry):
+        constants = self.constants
+        functions = self.functions
+        write = self.out.write
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        frames = []
+
+        function = functions[entry]
+        code = function.code
+        local_vars = [0] * function.num_locals
+        pc = 0
+
+        # Opcodes are tested roughly in order of how often they run
+        while True:
+            op = code[pc]
+            arg = code[pc + 1]
+            pc += 2
+            if op == LOAD_LOCAL:
+                push(local_vars[arg])
+            elif op == LOAD_CONST:
+                push(constants[arg])
+            elif op == STORE_LOCAL:
+                local_vars[arg] = pop()
+            elif op == JUMP_IF_FALSE:
+                if not pop():
+                    pc = arg
+            elif op == JUMP:
+                pc = arg
+            elif op == ADD:
+                right = pop()
+                stack[-1] += right
+            elif op == SUB:
+                right = pop()
+                stack[-1] -= right
+            elif op == MUL:
+                right = pop()
+                stack[-1] *= right
+            elif op == LT:
+                right = pop()
+                stack[-1] = 1 if stack[-1] < right else 0
+            elif op == GT:
+                right = pop()
+                stack[-1] = 1 if stack[-1] > right else 0
+            elif op == LE:
+                right = pop()
+                stack[-1] = 1 if stack[-1] <= right else 0
+            elif op == GE:
+                right = pop()
+                stack[-1] = 1 if stack[-1] >= right else 0
+            elif op == EQ:
+                right = pop()
+                stack[-1] = 1 if stack[-1] == right else 0
+            elif op == NE:
+                right = pop()
+                stack[-1] = 1 if stack[-1] != right else 0
+            elif op == INDEX:
+                index = pop()
+                stack[-1] = stack[-1][index]
+            elif op == STORE_INDEX:
+                value = pop()
+                index = pop()
+                local_vars[arg][index] = value
+            elif op == CALL:
+                callee = functions[arg]
+                new_locals = [0] * callee.num_locals
+                count = callee.num_params
+                if count:
+                    new_locals[:count] = stack[-count:]
+                    del stack[-count:]
+                frames.append((code, pc, local_vars))
+                code = callee.code
+                local_vars = new_locals
+                pc = 0
+            elif op == RETURN:
+                # The return value stays on the stack for the caller
+                if not frames:
+                    return pop()
+                code, pc, local_vars = frames.pop()
+            elif op == DIV_INT:
+                right = pop()
+                left = stack[-1]
+                if right == 0:
+                    raise ZeroDivisionError("integer division by zero")
+                quotient = abs(left) // abs(right)
+                stack[-1] = quotient if (left < 0) == (right < 0) else -quotient
+            elif op == DIV_FLOAT:
+                right = pop()
+                left = stack[-1]
+                if right == 0:
+                    stack[-1] = float("nan") if left == 0 else (float("inf") if left > 0 else float("-inf"))
+                else:
+                    stack[-1] = left / right
+            elif op == NEG:
+                stack[-1] = -stack[-1]
+            elif op == TO_INT:
+                stack[-1] = int(stack[-1])
+            elif op == POP:
+                pop()
+            elif op == PRINT_INT:
+                write(f"{pop()}\n")
+            elif op == PRINT_FLOAT:
+                write(f"{pop():f}\n")
+            elif op == PRINT_STR:
+                write(f"{pop()}\n")
+            elif op == MAKE_LIST:
+                if arg:
+                    elements = stack[-arg:]
+                    del stack[-arg:]
+                else:
+                    elements = []
+                push(elements)
+            else:
+                raise Exception(f"Unknown opcode {op} at {pc - 2} in {function.name}")
+
+
+def main():
+    if len(sys.argv) != 2:
+        print("Usage: python3 vm.py <source_file.litel>")
+        sys.exit(1)
+
+    code = read_input_file(sys.argv[1])
+    # Append a whitespace to the end of the code to ensure proper token detection
+    code += ' '
+
+    scanner = Scanner()
+    # The scanner reports lexical errors on stdout, which is reserved for program output here
+    with contextlib.redirect_stdout(sys.stderr):
+        tokens = scanner.scan(code)
+    if tokens is None:
+        print("Error: Lexical error detected. Aborting.", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        ast = Parser(tokens, symbols=scanner.symbols).parse()
+    except SyntaxError as e:
+        print(f"Syntax Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        constants, functions, entry = BytecodeCompiler(ast).compile()
+    except Exception as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+    status = VirtualMachine(constants, functions).run(entry)
+    sys.stdout.flush()
+    sys.exit(status if isinstance(status, int) else 0)
+
+
+if __name__ == "__main__":
+    main()